@@ -6,8 +6,29 @@ __author__ = 'Abner Rios'
 __version__ = '0.0.1'
 __license__ = 'MIT'
 
-from .element import ScheduledMatches
+import importlib
 
-class FbrefDayMatches(ScheduledMatches):
-  def __init__(self) -> None:
-      super().__init__()
\ No newline at end of file
+# public names and their module, imported on first access so `import fbref` does not load the parsing stack
+_EXPORTS = {
+    'FbrefDayMatches': 'element',
+    'ScheduledMatches': 'element',
+    'DayBatch': 'batch',
+    'FetchError': 'session',
+    'Session': 'session'
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    value = getattr(importlib.import_module(f'.{_EXPORTS[name]}', __name__), name)
+    globals()[name] = value
+
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(__all__))
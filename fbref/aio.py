@@ -0,0 +1,449 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from urllib.parse import urljoin
+from .element import ScheduledMatches, ScheduledMatch, Squad, SquadRegistry
+from .handlers import FetchHandlers, PreviousMatchHandlers
+from .metrics import stage
+from .session import FetchError, Session, default_session
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class AsyncResponse(object):
+    r"""``AsyncResponse`` holds a page read by an async client."""
+    def __init__(self, url: str, status_code: int, reason: str, content: bytes, headers: dict = None) -> None:
+        self.url = url
+        self.status_code = status_code
+        self.reason = reason
+        self.content = content
+        self.headers = headers or {}
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', errors='replace')
+
+
+class ThreadClient(object):
+    r"""``ThreadClient`` runs a `Session` in worker threads, used when `aiohttp` is not installed."""
+    def __init__(self, session: Session = None) -> None:
+        self.session = session or default_session()
+
+    async def get(self, url: str, headers: dict = None):
+        return await asyncio.to_thread(self.session.get, url, headers=headers)
+
+    async def close(self) -> None:
+        pass
+
+
+class AiohttpClient(object):
+    r"""``AiohttpClient`` reads pages with `aiohttp`, retrying like `Session`.
+
+        429 and 5xx answers are retried with exponential backoff, honouring `Retry-After`.
+
+    """
+    RETRY_STATUS = Session.RETRY_STATUS
+
+    def __init__(self, pool_size: int = 10, retries: int = 3, backoff_factor: float = 1.0, timeout: float = 30) -> None:
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.timeout = timeout
+        self._session = None
+
+    def _client_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit_per_host=self.pool_size),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+
+        return self._session
+
+    def _backoff(self, attempt: int, retry_after: str = None) -> float:
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+
+        return self.backoff_factor*(2**attempt)
+
+    async def get(self, url: str, headers: dict = None) -> AsyncResponse:
+        for attempt in range(self.retries+1):
+            try:
+                async with self._client_session().get(url, headers=headers) as rsp:
+                    content = await rsp.read()
+
+                    if rsp.status in self.RETRY_STATUS and attempt<self.retries:
+                        await asyncio.sleep(self._backoff(attempt, rsp.headers.get('Retry-After')))
+                        continue
+
+                    return AsyncResponse(str(rsp.url), rsp.status, rsp.reason, content, rsp.headers)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                if attempt>=self.retries:
+                    raise FetchError(f"Can't collect {url}. See error:\n {error}", url=url) from error
+
+                await asyncio.sleep(self._backoff(attempt))
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+
+
+def default_client(session: Session = None):
+    """Return an `AiohttpClient` when `aiohttp` is installed, a `ThreadClient` otherwise."""
+    if aiohttp is not None and session is None:
+        return AiohttpClient()
+
+    return ThreadClient(session)
+
+
+class AsyncFetchHandlers(FetchHandlers):
+    r"""``AsyncFetchHandlers`` requests pages from `fbref.com` without blocking the event loop.
+
+        :params concurrency: simultaneous requests allowed by the shared semaphore.
+        :params client: async client, see `default_client`.
+        :params semaphore: `asyncio.Semaphore` shared by every object created from this one.
+
+    """
+    def __init__(self, concurrency: int = 4, client=None, semaphore: asyncio.Semaphore = None, **options) -> None:
+        super().__init__(**options)
+        self.concurrency = concurrency
+        self.client = client or default_client(options.get('session'))
+        self.semaphore = semaphore or asyncio.Semaphore(concurrency)
+
+    def _options(self) -> dict:
+        return {
+            **super()._options(),
+            'concurrency': self.concurrency,
+            'client': self.client,
+            'semaphore': self.semaphore
+        }
+
+    async def _afetch(self, url: str, kind: str = 'page'):
+        """Return the response for `url`, from `cache` when it is fresh, see `FetchHandlers._fetch`.
+
+        :params kind: 'schedule', 'squad' or 'report', selects the cache TTL.
+        """
+        rsp = self._from_cache(url, kind)
+        if rsp is not None:
+            return rsp
+
+        if self.scheduler is not None:
+            with stage(self.metrics, 'wait', kind):
+                await self.scheduler.aacquire(kind)
+
+        async with self.semaphore:
+            with stage(self.metrics, 'fetch', kind):
+                rsp = await self.client.get(url, headers=self._conditional_headers(url))
+
+        return self._handle_response(url, kind, rsp)
+
+    async def close(self) -> None:
+        await self.client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+
+class AsyncSquad(Squad, AsyncFetchHandlers):
+    r"""``AsyncSquad`` is the async twin of `Squad`, match reports are fetched concurrently."""
+    async def match_summary(self, href, previous_matches, competitions, venue) -> None:
+        async for _ in self.iter_match_summary(href=href, previous_matches=previous_matches, competitions=competitions, venue=venue):
+            pass
+
+    async def refresh(self, href, previous_matches, competitions, venue) -> None:
+        """Collect the history again, with a `store` only new matches are fetched."""
+        self.history = []
+        await self.match_summary(href=href, previous_matches=previous_matches, competitions=competitions, venue=venue)
+
+    async def iter_match_summary(self, href, previous_matches, competitions, venue, ordered: bool = False):
+        """Yield each `PreviousMatch` as soon as its report is parsed, see `Squad.iter_match_summary`.
+
+        With a `store`, stored reports are yielded first and only the missing ones are fetched.
+        """
+        self._check_filters(competitions, venue)
+
+        squad_url = urljoin('https://fbref.com', href)
+        rsp = await self._afetch(squad_url, 'squad')
+        matchlog = await asyncio.to_thread(self._handle_squad_response, rsp)
+        previous_matches = self._select_previous_matches(matchlog, previous_matches, competitions, venue)
+        history = [None]*len(previous_matches)
+        reports = self._report_refs(previous_matches)
+        known = await asyncio.to_thread(self.store.load, squad_url) if self.store is not None else {}
+        stored = [(known.get(match_url) or {}).get('report') for match_url, _ in reports]
+        tasks = {
+            index: asyncio.ensure_future(self._aindexed_report(index, match_url, side))
+            for index, (match_url, side) in enumerate(reports) if stored[index] is None
+        }
+        collected = {}
+
+        try:
+            async for index, match_report in self._aiter_reports(stored, tasks, ordered):
+                if index in tasks:
+                    collected[reports[index][0]] = match_report
+
+                history[index] = self._previous_match(previous_matches[index], match_report)
+                yield history[index]
+        finally:
+            for task in tasks.values():
+                task.cancel()
+
+        if self.store is not None:
+            await asyncio.to_thread(self.store.save, squad_url, matchlog['rows'], collected, position=matchlog['position'], name=self.name)
+
+        self.history.extend(history)
+
+    async def _aiter_reports(self, stored: list, tasks: dict, ordered: bool):
+        # stored reports first then fetched ones as they complete, or everything in matchlog order
+        if ordered:
+            for index, match_report in enumerate(stored):
+                yield index, match_report if index not in tasks else (await tasks[index])[1]
+            return
+
+        for index, match_report in enumerate(stored):
+            if index not in tasks:
+                yield index, match_report
+
+        for task in asyncio.as_completed(tasks.values()):
+            yield await task
+
+    async def _aindexed_report(self, index: int, match_url: str, venue: str) -> tuple:
+        return index, await self._amatch_report(match_url, venue)
+
+    async def _amatch_report(self, match_url: str, venue: str) -> dict:
+        rsp = await self._afetch(urljoin('https://fbref.com/', match_url), 'report')
+
+        return await asyncio.to_thread(self._handle_report_response, rsp, venue)
+
+
+class AsyncPreviousMatchHandlers(PreviousMatchHandlers, AsyncFetchHandlers):
+    r"""``AsyncPreviousMatchHandlers`` reads squad pages and match reports with an async client."""
+    async def _amatchlog(self, squad_url: str) -> dict:
+        rsp = await self._afetch(squad_url, 'squad')
+
+        return await asyncio.to_thread(self._handle_squad_response, rsp)
+
+    async def _areport_sides(self, match_url: str) -> dict:
+        rsp = await self._afetch(urljoin('https://fbref.com/', match_url), 'report')
+
+        return await asyncio.to_thread(self._handle_report_sides, rsp)
+
+
+class AsyncSquadRegistry(object):
+    r"""``AsyncSquadRegistry`` is the async twin of `SquadRegistry`, sharing its memos.
+
+        Squads, matchlogs and match reports are kept in the memos of `registry`,
+        so a page collected by either API is not fetched again by the other one,
+        and concurrent callers of the same key wait for the first one.
+
+        See following example:
+
+            registry = AsyncSquadRegistry(SquadRegistry(), concurrency=4)
+
+            squad = await registry.squad('Arsenal', 'Premier League', 'Home', href, previous_matches=5, competitions='all', venue='same')
+
+    """
+    def __init__(self, registry: SquadRegistry = None, **options) -> None:
+        """
+        :params registry: `SquadRegistry` whose memos are shared.
+        :params options: fetch options, see `AsyncFetchHandlers`.
+        """
+        self.registry = registry or SquadRegistry()
+        self.options = options
+        self._lock = threading.Lock()
+        self._handlers = None
+
+    key = staticmethod(SquadRegistry.key)
+
+    @property
+    def handlers(self) -> AsyncPreviousMatchHandlers:
+        """Async fetch handlers shared by every squad of the registry."""
+        with self._lock:
+            if self._handlers is None:
+                self._handlers = AsyncPreviousMatchHandlers(**self.options)
+
+            return self._handlers
+
+    async def _memo(self, memo: dict, key, func):
+        # same futures as `SquadRegistry._memo`, awaited without blocking the event loop
+        with self.registry._lock:
+            future = memo.get(key)
+            owner = future is None
+
+            if owner:
+                future = memo[key] = Future()
+
+        if not owner:
+            return await asyncio.wrap_future(future)
+
+        try:
+            result = await func()
+        except BaseException as error:
+            with self.registry._lock:
+                del memo[key]
+            future.set_exception(error)
+            raise
+
+        future.set_result(result)
+
+        return result
+
+    async def matchlog(self, squad_url: str) -> dict:
+        """Return the matchlog of a squad page, fetched once."""
+        return await self._memo(self.registry._matchlogs, squad_url, lambda: self.handlers._amatchlog(squad_url))
+
+    async def report(self, match_url: str, side: str) -> dict:
+        """Return one side of a match report, the page is fetched and parsed once for both sides."""
+        return (await self._memo(self.registry._reports, match_url, lambda: self.handlers._areport_sides(match_url)))[side]
+
+    async def squad(self, name: str, competition: str, side: str, href: str, previous_matches: int, competitions: str, venue: str) -> Squad:
+        """Return the squad with its history collected, built on first use."""
+        key = self.key(href, previous_matches, competitions, venue, competition, side)
+
+        return await self._memo(self.registry._squads, key, lambda: self._build(name, competition, side, href, previous_matches, competitions, venue))
+
+    async def _build(self, name, competition, side, href, previous_matches, competitions, venue) -> Squad:
+        squad = AsyncSquad(name=name, competition=competition, venue=side, **self.options)
+        squad._check_filters(competitions, venue)
+        squad_url = urljoin('https://fbref.com', href)
+        matchlog = await self.matchlog(squad_url)
+        previous_matches = squad._select_previous_matches(matchlog, previous_matches, competitions, venue)
+        squad._build_history(previous_matches, await self._squad_reports(squad, squad_url, matchlog, previous_matches))
+
+        return squad
+
+    async def _squad_reports(self, squad: Squad, squad_url: str, matchlog: dict, previous_matches: list) -> list:
+        refs = squad._report_refs(previous_matches)
+        known = await asyncio.to_thread(squad.store.load, squad_url) if squad.store is not None else {}
+        stored = [(known.get(match_url) or {}).get('report') for match_url, _ in refs]
+
+        async def match_report(index: int) -> dict:
+            return stored[index] if stored[index] is not None else await self.report(*refs[index])
+
+        match_reports = await asyncio.gather(*(match_report(index) for index in range(len(refs))))
+
+        if squad.store is not None:
+            collected = {refs[index][0]: match_reports[index] for index in range(len(refs)) if stored[index] is None}
+            await asyncio.to_thread(squad.store.save, squad_url, matchlog['rows'], collected, position=matchlog['position'], name=squad.name)
+
+        return match_reports
+
+
+class AsyncScheduledMatch(ScheduledMatch):
+    r"""``AsyncScheduledMatch`` is the async twin of `ScheduledMatch`.
+
+        Home and away squads are collected concurrently, so `describe` takes about
+        as long as the slowest squad instead of the sum of every page.
+
+    """
+    __slots__ = ()
+
+    async def _stats(self, side: str, name: str, href: str, previous_matches: int, competitions: str, venue: str) -> AsyncSquad:
+        # `_registry` is the `AsyncSquadRegistry` of the matches, pages are shared between views and fixtures
+        return await self._registry.squad(name, self.competition, side, href, previous_matches, competitions, venue)
+
+    async def home_stats(self, previous_matches: int, competitions: str, venue: str) -> AsyncSquad:
+        """Return statistics from Home team last N `~previous_matches` games.
+
+        :params previous_matches: number of matches to considerate on summary.
+        """
+        return await self._stats('Home', self.home, self._home_ref, previous_matches, competitions, venue)
+
+    async def away_stats(self, previous_matches: int, competitions: str, venue: str) -> AsyncSquad:
+        """Return statistics from Away team last N `~previous_matches` games.
+
+        :params previous_matches: number of matches to considerate on summary.
+        """
+        return await self._stats('Away', self.away, self._away_ref, previous_matches, competitions, venue)
+
+    async def describe2(self, previous_matches: int) -> str:
+        home, away = await asyncio.gather(
+            self.home_stats(previous_matches=previous_matches, competitions='all', venue='all'),
+            self.away_stats(previous_matches=previous_matches, competitions='all', venue='all')
+        )
+
+        return self._describe2(home, away)
+
+    async def describe(self, previous_matches: int) -> str:
+        home, away = await asyncio.gather(
+            self.home_stats(previous_matches=previous_matches, competitions='all', venue='same'),
+            self.away_stats(previous_matches=previous_matches, competitions='all', venue='same')
+        )
+
+        return self._describe(home, away)
+
+
+class AsyncScheduledMatches(ScheduledMatches, AsyncFetchHandlers):
+    r"""``AsyncScheduledMatches`` is the async twin of `ScheduledMatches`.
+
+        See following example:
+
+            async with AsyncScheduledMatches(concurrency=4) as matches:
+
+                for match in await matches.day_matches('YYYY-MM-DD'):
+                    print(await match.describe(previous_matches=5))
+
+        Matches share an `AsyncSquadRegistry` over `registry`, squad pages and
+        match reports are fetched once for every view of every fixture.
+
+    """
+    def __init__(self, registry: SquadRegistry = None, **options) -> None:
+        super().__init__(registry=registry, **options)
+        self.async_registry = AsyncSquadRegistry(self.registry, **self._options())
+
+    def _new_match(self) -> AsyncScheduledMatch:
+        return AsyncScheduledMatch(registry=self.async_registry, **self._options())
+
+    async def day_matches(self, date=None, competitions: list = None) -> list:
+        """Return matches from specified date.
+
+        :params date: 'YYYY-MM-DD'
+        :params competitions: names or fbref ids of the competitions to keep, every one by default.
+        """
+        date = self._handle_date(date)
+        rsp = await self._afetch(f'https://fbref.com/en/matches/{date}', 'schedule')
+
+        return self._handle_day_matches(rsp, date, competitions)
+
+    async def iter_day_matches(self, date=None, competitions: list = None):
+        """Yield matches from specified date in page order, see `ScheduledMatches.iter_day_matches`."""
+        date = self._handle_date(date)
+        rsp = await self._afetch(f'https://fbref.com/en/matches/{date}', 'schedule')
+
+        for match in self._iter_schedule(self._schedule_soup(rsp, competitions), date, competitions):
+            yield match
+
+    async def matches_between(self, start, end, competitions: list = None) -> list:
+        """Return matches of every day from `start` to `end`, see `ScheduledMatches.matches_between`."""
+        days = await asyncio.gather(*(self._aday_schedule(date, competitions) for date in self._dates(start, end)))
+        matches = [match for day_matches in days for match in day_matches]
+
+        return list(self._unique(sorted(matches, key=lambda match: (match.date, match.time))))
+
+    async def iter_matches_between(self, start, end, competitions: list = None):
+        """Yield matches of every day from `start` to `end`, a day as soon as its page is parsed.
+
+        Schedule pages are fetched concurrently, a fixture listed on two days is yielded once.
+        """
+        seen = set()
+        tasks = [asyncio.ensure_future(self._aday_schedule(date, competitions)) for date in self._dates(start, end)]
+
+        try:
+            for task in asyncio.as_completed(tasks):
+                for match in self._unique(await task, seen):
+                    yield match
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _aday_schedule(self, date: str, competitions: list = None) -> list:
+        rsp = await self._afetch(f'https://fbref.com/en/matches/{date}', 'schedule')
+        soup = self._schedule_soup(rsp, competitions)
+
+        with stage(self.metrics, 'extract', 'schedule'):
+            return [match._materialize() for match in self._iter_schedule(soup, date, competitions)]
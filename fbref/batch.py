@@ -0,0 +1,116 @@
+import logging
+from urllib.parse import urljoin
+from .element import ScheduledMatches, SquadRegistry
+from .handlers import PreviousMatchHandlers
+from .pool import fetch_all
+from .session import FetchError
+
+logger = logging.getLogger('fbref')
+
+
+class DayBatch(PreviousMatchHandlers):
+    r"""``DayBatch`` collects statistics for every match of a day downloading each page once.
+
+        Squad pages and match reports shared by several fixtures (or needed by both
+        `describe` and `describe2`) are fetched a single time through a `SquadRegistry`
+        shared with every returned match. A fixture whose squad page or match
+        reports can't be collected (after the `Session` retries) is left out and
+        kept in `failures` with its `FetchError`, the other fixtures are returned.
+
+        See following example:
+
+            batch = DayBatch(previous_matches=5)
+
+            for match in batch.run('YYYY-MM-DD'):
+                print(match.describe(previous_matches=5))
+
+    """
+    VIEWS = (('all', 'same'), ('all', 'all'))
+
+    def __init__(self, previous_matches: int, views: tuple = VIEWS, max_workers: int = 8, registry: SquadRegistry = None, **options) -> None:
+        """
+        :params previous_matches: number of matches to considerate on summary.
+        :params views: `(competitions, venue)` filters collected for every squad,
+            defaults to the ones used by `describe` and `describe2`.
+        :params registry: `SquadRegistry` to share squads and pages with other batches, e.g. other days.
+        :params options: fetch options, see `FetchHandlers`.
+        """
+        super().__init__(max_workers=max_workers, **options)
+        self.previous_matches = previous_matches
+        self.views = views
+        self.registry = registry or SquadRegistry(**self._options())
+        # `(match, FetchError)` of the fixtures left out by the last run
+        self.failures = []
+
+    def _squad_refs(self, matches: list) -> list:
+        refs = []
+
+        for match in matches:
+            refs.append((match, 'Home', match.home, match._home_ref))
+            refs.append((match, 'Away', match.away, match._away_ref))
+
+        return refs
+
+    def run(self, date=None, competitions: list = None) -> list:
+        """Return matches from specified date with home and away squads already collected.
+
+        Fixtures that failed are not returned, see `failures`.
+
+        :params date: 'YYYY-MM-DD'
+        :params competitions: names or fbref ids of the competitions to keep, every one by default.
+        """
+        matches = ScheduledMatches(registry=self.registry, **self._options()).day_matches(date, competitions)
+
+        return self._collect(matches)
+
+    def run_between(self, start, end, competitions: list = None) -> list:
+        """Return matches of every day from `start` to `end` (both included) with their squads collected.
+
+        A fixture listed on two days is kept once, see `ScheduledMatches.matches_between`.
+        """
+        matches = ScheduledMatches(registry=self.registry, **self._options()).matches_between(start, end, competitions)
+
+        return self._collect(matches)
+
+    def _collect(self, matches: list) -> list:
+        refs = self._squad_refs(matches)
+        # one page failing leaves its fixtures out, not the whole batch
+        failed = {}
+
+        # squad pages, one request per squad
+        squad_urls = list(dict.fromkeys(urljoin('https://fbref.com', href) for _, _, _, href in refs))
+        page_errors = dict(zip(squad_urls, fetch_all(lambda squad_url: _failure(self.registry.matchlog, squad_url), squad_urls, max_workers=self.max_workers)))
+
+        for match, _, _, href in refs:
+            error = page_errors[urljoin('https://fbref.com', href)]
+            if error is not None:
+                failed.setdefault(match, error)
+
+        # every view of every squad left, reports shared between views and squads are fetched once
+        views = [(match, side, name, href, view) for match, side, name, href in refs if match not in failed for view in self.views]
+        errors = fetch_all(
+            lambda view: _failure(self.registry.squad, view[2], view[0].competition, view[1], view[3], self.previous_matches, *view[4]),
+            views,
+            max_workers=self.max_workers
+        )
+
+        for view, error in zip(views, errors):
+            if error is not None:
+                failed.setdefault(view[0], error)
+
+        for match, error in failed.items():
+            logger.warning("fbref: can't collect %s X %s (%s): %s", match.home, match.away, match.competition, error)
+
+        self.failures = list(failed.items())
+
+        return [match for match in matches if match not in failed]
+
+
+def _failure(func, *args) -> FetchError:
+    # `None` when the call succeeded, its result is kept by the registry
+    try:
+        func(*args)
+    except FetchError as error:
+        return error
+
+    return None
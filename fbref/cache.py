@@ -0,0 +1,312 @@
+import os
+import gzip
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class CachedResponse(object):
+    r"""``CachedResponse`` mimics the parts of `requests.Response` used by the handlers."""
+    def __init__(self, url: str, content: bytes, not_modified: bool = False) -> None:
+        """
+        :params not_modified: the page was revalidated by a 304 answer.
+        """
+        self.url = url
+        self.content = content
+        self.status_code = 200
+        self.reason = 'OK'
+        self.from_cache = True
+        self.not_modified = not_modified
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', errors='replace')
+
+
+class PageCache(object):
+    r"""``PageCache`` keeps `fbref.com` pages by url, in memory and optionally on disk.
+
+        Pages live in an LRU memory tier in front of a directory of gzip files.
+        Freshness is checked on read with a TTL per kind of page, `None` never expires:
+        match reports of played matches do not change, while squad pages and the day
+        schedule do. Expired pages are kept with their `ETag`/`Last-Modified` to be
+        revalidated, and results parsed from a page are reused while it is unchanged.
+
+        See following example:
+
+            cache = PageCache(directory='~/.cache/fbref')
+
+            matches = ScheduledMatches(cache=cache)
+
+            matches.day_matches('YYYY-MM-DD')
+
+    """
+    TTL = {
+        'schedule': 10*60,
+        'squad': 60*60,
+        'report': None,
+        'page': 10*60
+    }
+
+    def __init__(self, directory: str = None, ttl: dict = None, max_items: int = 256, max_disk_bytes: int = 512*1024*1024) -> None:
+        """
+        :params directory: folder of the disk tier, memory only when not informed.
+        :params ttl: seconds per kind of page (`schedule`, `squad`, `report`), merged over `TTL`.
+        :params max_items: pages kept in the memory tier.
+        :params max_disk_bytes: size of the disk tier before the oldest pages are evicted.
+        """
+        self.ttl = {**self.TTL, **(ttl or {})}
+        self.max_items = max_items
+        self.max_disk_bytes = max_disk_bytes
+        self.directory = os.path.expanduser(directory) if directory else None
+        self._memory = OrderedDict()
+        self._parsed = {}
+        self._lock = threading.Lock()
+        self._disk_bytes = 0
+
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            self._disk_bytes = sum(os.path.getsize(path) for path in self._disk_files())
+
+    def _key(self, url: str) -> str:
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, f'{self._key(url)}.html.gz')
+
+    def _validators_path(self, path: str) -> str:
+        return f"{path[:-len('.html.gz')]}.json"
+
+    def _disk_files(self) -> list:
+        return [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith('.html.gz')]
+
+    def _is_fresh(self, stored_at: float, kind: str) -> bool:
+        ttl = self.ttl.get(kind, self.ttl['page'])
+
+        return ttl is None or time.time()-stored_at<ttl
+
+    def _remember(self, url: str, stored_at: float, content: bytes, validators: dict) -> tuple:
+        entry = self._memory[url] = (stored_at, content, validators)
+        self._memory.move_to_end(url)
+
+        while len(self._memory)>self.max_items:
+            evicted, _ = self._memory.popitem(last=False)
+            self._parsed.pop(evicted, None)
+
+        return entry
+
+    def _entry(self, url: str, kind: str = None) -> tuple:
+        # `(stored_at, content, validators)`, expired pages too when `kind` is None
+        with self._lock:
+            if url in self._memory:
+                entry = self._memory[url]
+
+                if kind is not None and not self._is_fresh(entry[0], kind):
+                    return None
+
+                self._memory.move_to_end(url)
+                return entry
+
+        if not self.directory:
+            return None
+
+        # the disk tier is read without the lock, only the memory tier is shared
+        entry = self._read(url, kind)
+        if entry is None:
+            return None
+
+        with self._lock:
+            current = self._memory.get(url)
+
+            # a page stored while this one was read wins
+            if current is not None and current[0]>=entry[0]:
+                return current
+
+            return self._remember(url, *entry)
+
+    def _read(self, url: str, kind: str = None) -> tuple:
+        path = self._path(url)
+
+        try:
+            stored_at = os.path.getmtime(path)
+            if kind is not None and not self._is_fresh(stored_at, kind):
+                return None
+
+            with gzip.open(path, 'rb') as page:
+                content = page.read()
+        except (OSError, EOFError):
+            return None
+
+        try:
+            with open(self._validators_path(path)) as validators:
+                validators = json.load(validators)
+        except (OSError, ValueError):
+            validators = {}
+
+        return stored_at, content, validators
+
+    def get(self, url: str, kind: str = 'page') -> bytes:
+        """Return the cached page or `None` when it is missing or expired."""
+        entry = self._entry(url, kind)
+
+        return entry[1] if entry else None
+
+    def validators(self, url: str) -> dict:
+        """Return the `etag`/`last_modified` stored with a page, expired or not."""
+        entry = self._entry(url)
+
+        return entry[2] if entry else {}
+
+    def revalidate(self, url: str) -> bytes:
+        """Mark a page confirmed unchanged by a 304 answer as fresh again, return its content."""
+        entry = self._entry(url)
+        if entry is None:
+            return None
+
+        stored_at = time.time()
+
+        with self._lock:
+            self._remember(url, stored_at, entry[1], entry[2])
+
+        if self.directory:
+            try:
+                os.utime(self._path(url), (stored_at, stored_at))
+            except OSError:
+                pass
+
+        return entry[1]
+
+    def memo(self, url: str, key, parse, reuse: bool = False):
+        """Return `parse()` for a page, or the result kept under `key` when `reuse` and the page did not change.
+
+        Results are kept while the page stays in the memory tier and is not replaced.
+        """
+        with self._lock:
+            results = self._parsed.get(url, {})
+            if reuse and key in results:
+                return results[key]
+
+        result = parse()
+
+        with self._lock:
+            if url in self._memory:
+                self._parsed.setdefault(url, {})[key] = result
+
+        return result
+
+    def set(self, url: str, content: bytes, kind: str = 'page', validators: dict = None) -> None:
+        """Store a page in memory and on disk.
+
+        :params validators: `etag`/`last_modified` of the response, see `validators`.
+        """
+        stored_at = time.time()
+        validators = validators or {}
+
+        with self._lock:
+            self._remember(url, stored_at, content, validators)
+            self._parsed.pop(url, None)
+
+        if not self.directory:
+            return
+
+        # pages are compressed to temporary files without the lock, then moved in place with it
+        path = self._path(url)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+
+        with gzip.open(tmp_path, 'wb') as page:
+            page.write(content)
+
+        tmp_validators = self._write_validators(path, validators)
+
+        with self._lock:
+            previous_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+            self._replace_validators(path, tmp_validators)
+            self._disk_bytes += os.path.getsize(path)-previous_size
+            over = self._disk_bytes>self.max_disk_bytes
+
+        if over:
+            self._evict()
+
+    def _write_validators(self, path: str, validators: dict) -> str:
+        # returns the temporary file written, `None` when there is nothing to keep
+        if not validators:
+            return None
+
+        validators_path = f'{self._validators_path(path)}.{threading.get_ident()}.tmp'
+
+        with open(validators_path, 'w') as stored:
+            json.dump(validators, stored)
+
+        return validators_path
+
+    def _replace_validators(self, path: str, tmp_validators: str) -> None:
+        validators_path = self._validators_path(path)
+
+        if tmp_validators:
+            os.replace(tmp_validators, validators_path)
+        elif os.path.exists(validators_path):
+            os.remove(validators_path)
+
+    def _remove(self, path: str) -> None:
+        os.remove(path)
+
+        if os.path.exists(self._validators_path(path)):
+            os.remove(self._validators_path(path))
+
+    def _mtime(self, path: str) -> float:
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return 0
+
+    def _evict(self) -> None:
+        # oldest pages leave first, files are listed without the lock
+        for path in sorted(self._disk_files(), key=self._mtime):
+            with self._lock:
+                if self._disk_bytes<=self.max_disk_bytes:
+                    break
+
+                try:
+                    size = os.path.getsize(path)
+                    self._remove(path)
+                except OSError:
+                    # removed by another thread
+                    continue
+
+                self._disk_bytes -= size
+
+    def clear(self) -> None:
+        """Remove every page from memory and disk."""
+        with self._lock:
+            self._memory.clear()
+            self._parsed.clear()
+
+            if self.directory:
+                for path in self._disk_files():
+                    self._remove(path)
+
+            self._disk_bytes = 0
+
+
+def validators(rsp) -> dict:
+    """Return the `ETag` and `Last-Modified` of a response, used to revalidate it later."""
+    headers = getattr(rsp, 'headers', None) or {}
+    validators = {'etag': headers.get('ETag'), 'last_modified': headers.get('Last-Modified')}
+
+    return {name: value for name, value in validators.items() if value}
+
+
+def conditional_headers(validators: dict) -> dict:
+    """Return the `If-None-Match`/`If-Modified-Since` headers revalidating a stored page."""
+    headers = {}
+
+    if validators.get('etag'):
+        headers['If-None-Match'] = validators['etag']
+
+    if validators.get('last_modified'):
+        headers['If-Modified-Since'] = validators['last_modified']
+
+    return headers
@@ -0,0 +1,164 @@
+import sys
+import argparse
+from types import SimpleNamespace
+
+# `text` writes `describe` previews, the others squad histories, see `fbref.export`
+FORMATS = ('jsonl', 'csv', 'parquet', 'arrow', 'text')
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='fbref', description='Collect matches data from fbref.com.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    batch = commands.add_parser('batch', help='collect the squads of every fixture of a day or a date range')
+    day = batch.add_mutually_exclusive_group()
+    day.add_argument('--date', help="'YYYY-MM-DD', today by default")
+    day.add_argument('--start', help="first day of a range, 'YYYY-MM-DD'")
+    batch.add_argument('--end', help="last day of a range, 'YYYY-MM-DD', same as --start by default")
+    batch.add_argument('-c', '--competitions', nargs='+', help='names or fbref ids of the competitions to keep')
+    batch.add_argument('-n', '--previous-matches', type=int, default=7, help='matches considered for each squad')
+    _add_output(batch, FORMATS)
+    batch.add_argument('--cache', help='directory of a `PageCache`')
+    batch.add_argument('--warehouse', help='SQLite `Warehouse` keeping the collected matches')
+    batch.add_argument('--workers', type=int, default=8, help='threads fetching pages')
+    batch.add_argument('--processes', type=int, help='processes parsing pages')
+    batch.add_argument('--parser', help="`BeautifulSoup` backend, e.g. 'lxml'")
+    batch.add_argument('--rpm', type=float, help='requests per minute, see `CrawlScheduler`')
+    batch.set_defaults(run=run_batch)
+
+    export = commands.add_parser('export', help='write the squads kept in a `Warehouse`, without any request')
+    export.add_argument('warehouse', help='SQLite `Warehouse` path')
+    export.add_argument('-n', '--previous-matches', type=int, help='last matches written for each squad, every one by default')
+    _add_output(export, FORMATS[:-1])
+    export.set_defaults(run=run_export)
+
+    return parser
+
+
+def _add_output(parser: argparse.ArgumentParser, formats: tuple) -> None:
+    parser.add_argument('-o', '--output', help='output path, stdout for text by default')
+    parser.add_argument('-f', '--format', choices=formats, default='jsonl')
+    parser.add_argument('--events', help='write events to this path as a separate table')
+
+
+def main(argv: list = None, **options) -> int:
+    """Run the `fbref` command.
+
+    :params argv: command line arguments, `sys.argv[1:]` by default.
+    :params options: fetch options added to the command line ones, e.g. a `session`.
+    """
+    args = build_parser().parse_args(argv)
+
+    return args.run(args, **options)
+
+
+def _writer(args):
+    # modules are imported by the commands using them, `fbref --help` loads none of them
+    from .export import ArrowWriter, CsvWriter, JsonlWriter, ParquetWriter
+
+    writers = {'jsonl': JsonlWriter, 'csv': CsvWriter, 'parquet': ParquetWriter, 'arrow': ArrowWriter}
+
+    if not args.output:
+        raise SystemExit(f'fbref: --output is required with --format {args.format}')
+
+    return writers[args.format](args.output, events_path=args.events)
+
+
+def _fetch_options(args) -> dict:
+    options = {'max_workers': args.workers, 'parser': args.parser, 'processes': args.processes}
+
+    if args.cache:
+        from .cache import PageCache
+        options['cache'] = PageCache(directory=args.cache)
+
+    if args.warehouse:
+        from .warehouse import Warehouse
+        options['store'] = Warehouse(args.warehouse)
+
+    if args.rpm:
+        from .scheduler import CrawlScheduler
+        options['scheduler'] = CrawlScheduler(rpm=args.rpm)
+
+    return options
+
+
+def run_batch(args, **options) -> int:
+    from .batch import DayBatch
+
+    if args.end and not args.start:
+        raise SystemExit('fbref: --end requires --start')
+
+    fetch_options = _fetch_options(args)
+
+    try:
+        batch = DayBatch(args.previous_matches, **{**fetch_options, **options})
+
+        if args.start:
+            matches = batch.run_between(args.start, args.end or args.start, args.competitions)
+        else:
+            matches = batch.run(args.date, args.competitions)
+
+        _write_batch(args, matches)
+    finally:
+        # only the warehouse opened here, not one handed in `options`
+        if 'store' in fetch_options:
+            fetch_options['store'].close()
+
+    # every failed fixture was logged by the batch, the others are written
+    if batch.failures:
+        sys.stderr.write(f'fbref: {len(batch.failures)} fixture(s) not collected\n')
+        return 1
+
+    return 0
+
+
+def _write_batch(args, matches: list) -> None:
+    if args.format=='text':
+        if not args.output:
+            _write_text(sys.stdout, matches, args.previous_matches)
+            return
+
+        with open(args.output, 'w') as output:
+            _write_text(output, matches, args.previous_matches)
+
+        return
+
+    with _writer(args) as writer:
+        written = set()
+
+        for match in matches:
+            for side, href in (('home', match._home_ref), ('away', match._away_ref)):
+                # a squad playing several fixtures of the range is written once
+                if href not in written:
+                    written.add(href)
+                    writer.write(getattr(match, f'{side}_stats')(args.previous_matches, 'all', 'all'))
+
+
+def _write_text(output, matches, previous_matches: int) -> None:
+    for match in matches:
+        output.write(match.describe(previous_matches=previous_matches))
+
+
+def run_export(args, **options) -> int:
+    from .models import PreviousMatch
+    from .warehouse import Warehouse
+
+    warehouse = Warehouse(args.warehouse)
+
+    try:
+        with _writer(args) as writer:
+            for squad_url in warehouse.squads():
+                rows = warehouse.previous_matches(squad_url, args.previous_matches or -1)
+                history = [PreviousMatch.from_row(row, report) for row, report in rows]
+                # the name written by `batch`, squads stored without one are named from their url
+                writer.write(SimpleNamespace(name=warehouse.name(squad_url) or _squad_name(squad_url), history=history))
+    finally:
+        warehouse.close()
+
+    return 0
+
+
+def _squad_name(squad_url: str) -> str:
+    # '/en/squads/18bb7c10/Manchester-United-Stats' is 'Manchester United'
+    return squad_url.rstrip('/').split('/')[-1].removesuffix('-Stats').replace('-', ' ')
+
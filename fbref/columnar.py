@@ -0,0 +1,131 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .stats import TOTALS
+
+COLUMNS = TOTALS + ('possession',)
+RESULTS = ('W', 'D', 'L')
+
+
+class HistoryFrame(object):
+    r"""``HistoryFrame`` stores the history of one or many squads as NumPy columns.
+
+        Every numeric attribute of `PreviousMatch` becomes a float array with a
+        boolean mask of known values, `result` is coded as 0 (W), 1 (D), 2 (L) or -1,
+        and `squad` tells which squad each row belongs to. Aggregates are reductions
+        over the whole frame, one value per squad.
+
+        See following example:
+
+            frame = HistoryFrame.from_squads([home, away])
+
+            frame.totals('corners')
+
+            frame.summary()[0]['corners']
+
+    """
+    def __init__(self, names: list, squad, result, columns: dict, mask: dict) -> None:
+        self.names = names
+        self.squad = squad
+        self.result = result
+        self.columns = columns
+        self.mask = mask
+
+    @classmethod
+    def from_squads(cls, squads: list) -> 'HistoryFrame':
+        """Build one frame holding the history of every squad, e.g. a whole league."""
+        if np is None:
+            raise ImportError('HistoryFrame requires numpy, install it with `pip install numpy`.')
+
+        histories = [squad.history for squad in squads]
+        rows = sum(len(history) for history in histories)
+        squad = np.repeat(np.arange(len(squads)), [len(history) for history in histories])
+        result = np.full(rows, -1, dtype=np.int8)
+        columns = {column: np.zeros(rows, dtype=np.float64) for column in COLUMNS}
+        mask = {column: np.zeros(rows, dtype=bool) for column in COLUMNS}
+
+        row = 0
+        for history in histories:
+            for match in history:
+                if match.result in RESULTS:
+                    result[row] = RESULTS.index(match.result)
+
+                for column in COLUMNS:
+                    value = getattr(match, column)
+
+                    if isinstance(value, (int, float)) and not isinstance(value, bool):
+                        columns[column][row] = value
+                        mask[column][row] = True
+
+                row += 1
+
+        return cls([squad.name for squad in squads], squad, result, columns, mask)
+
+    @classmethod
+    def from_history(cls, squad) -> 'HistoryFrame':
+        return cls.from_squads([squad])
+
+    def _per_squad(self, values):
+        return np.bincount(self.squad, weights=values, minlength=len(self.names))
+
+    def matches(self):
+        """Return the number of matches of each squad."""
+        return np.bincount(self.squad, minlength=len(self.names))
+
+    def totals(self, column: str):
+        """Return the sum of the known values of `column` for each squad."""
+        return self._per_squad(np.where(self.mask[column], self.columns[column], 0.0))
+
+    def averages(self, column: str):
+        """Return the total of `column` divided by the matches of each squad."""
+        matches = self.matches()
+
+        return np.divide(self.totals(column), matches, out=np.zeros(len(self.names)), where=matches>0)
+
+    def results(self):
+        """Return an array of (W, D, L) counts, one row per squad."""
+        counts = np.zeros((len(self.names), len(RESULTS)), dtype=np.int64)
+        played = self.result>=0
+        np.add.at(counts, (self.squad[played], self.result[played]), 1)
+
+        return counts
+
+    def clean_sheets(self):
+        """Return the matches without goals against of each squad."""
+        clean = self.mask['goals_against'] & (self.columns['goals_against']==0)
+
+        return self._per_squad(clean.astype(np.float64)).astype(np.int64)
+
+    def summary(self) -> list:
+        """Return the totals, averages and results of `Squad.stats` for every squad, in `names` order."""
+        matches = self.matches()
+        results = self.results()
+        clean_sheets = self.clean_sheets()
+        totals = {column: self.totals(column) for column in TOTALS}
+        summary = []
+
+        for i in range(len(self.names)):
+            squad_matches = int(matches[i])
+            wins, draws, losses = (int(count) for count in results[i])
+            squad_summary = {
+                'matches': squad_matches,
+                'results': {'W': wins, 'L': losses, 'D': draws, 'pts_pct': 0},
+                'clean_sheets': int(clean_sheets[i])
+            }
+
+            for column in TOTALS:
+                total = totals[column][i]
+                total = int(total) if total.is_integer() else float(total)
+                squad_summary[column] = {
+                    'total': total,
+                    'avg': round(total/squad_matches, 2) if squad_matches>0 else 0.0
+                }
+
+            if squad_matches>0:
+                squad_summary['results']['pts_pct'] = round(((wins*3+draws)/(squad_matches*3))*100, 0)
+
+            summary.append(squad_summary)
+
+        return summary
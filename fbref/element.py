@@ -1,16 +1,22 @@
 from urllib.parse import urljoin
-import requests
-import re
 import json
 import csv
-from datetime import datetime
-import time
-from collections import Counter
-from bs4 import BeautifulSoup
-from .handlers import PreviousMatchHandlers
-
-
-class ScheduledMatches:
+import threading
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from .export import FIELDS, match_row
+from .extract import SCHEDULE_ID, SCHEDULE_ONLY, SCHEDULE_FIELDS, NAME_SUFFIX, kickoff_epoch, make_soup, schedule_cells, schedule_strainer
+from .metrics import stage
+from .handlers import FetchHandlers, PreviousMatchHandlers
+from .models import PreviousMatch
+from .pool import fetch_all, in_order, iter_all
+from .stats import aggregate
+
+# stats of a match whose report was not collected
+EMPTY_REPORT = {'corners': None, 'shots': None, 'shots_on_target': None, 'offsides': None, 'fouls': None, 'summary': []}
+
+
+class ScheduledMatches(FetchHandlers):
     r"""``Matches`` allows you to collect all matches of the day from `fbref.com`.
 
         See following example:
@@ -19,107 +25,200 @@ class ScheduledMatches:
 
             matches.day_matches('YYYY-MM-DD')
 
+            # or each match as soon as its row is read, in page order
+            for match in matches.iter_day_matches('YYYY-MM-DD'):
+                ...
+
+            # every day of a range, schedule pages fetched concurrently
+            matches.matches_between('YYYY-MM-DD', 'YYYY-MM-DD', competitions=['Premier League'])
+
+        Fetch options (see `FetchHandlers`) are handed to every `ScheduledMatch`
+        and `Squad` created from it. Matches share a `SquadRegistry`, so a squad
+        playing several fixtures is collected once.
+
     """
+    def __init__(self, registry=None, **options) -> None:
+        super().__init__(**options)
+        # the registry collects squads with blocking requests, async options are left out
+        self.registry = registry or SquadRegistry(**self._sync_options())
+
     def _handle_date(self, date) -> str:
         
         if not date:
             return datetime.now().strftime('%Y-%m-%d')
         else:
-            return date
+            return str(date)
+
+    def _dates(self, start, end) -> list:
+        start = datetime.strptime(self._handle_date(start), '%Y-%m-%d').date()
+        end = datetime.strptime(self._handle_date(end), '%Y-%m-%d').date()
 
-    def day_matches(self, date) -> list:
+        return [str(start+timedelta(days=day)) for day in range((end-start).days+1)]
+
+    def day_matches(self, date=None, competitions: list = None) -> list:
         """Return matches from specified date.
 
-        :params date: 'YYYY-MM-DD'
+        :params date: 'YYYY-MM-DD', today by default.
+        :params competitions: names or fbref ids of the competitions to keep, every one by default.
         """
         date = self._handle_date(date)
-        rsp = requests.request('GET', f'https://fbref.com/en/matches/{date}')
-        content = rsp.content
-        day_matches = []
-
-        if rsp.status_code < 400:
-            soup = BeautifulSoup(content, 'html.parser')
-            all_sched_tables = soup.find_all('div', attrs={'id': re.compile('all_sched_\\d+')})
-
-            for sched_table in all_sched_tables:
-                competition = sched_table.find('h2').find('a').text
-                tbody = sched_table.find('tbody')
-                rows = tbody.find_all('tr')
-
-                for row in rows:
-                    if not row.attrs.get('class'):
-                        match = ScheduledMatch()
-                        data = row.find_all('td')
-                        match_dict = {stat.attrs['data-stat']: stat for stat in data}
-
-                        try:
-                            venue_epoch = match_dict.get('time').next_element.get('data-venue-epoch')
-                        except AttributeError:
-                            venue_epoch = None
-
-                        # set match attributes
-                        match.competition = competition
-                        match.home = match_dict.get('squad_a').text
-                        match.away = match_dict.get('squad_b').text
-                        match.score = match_dict.get('score').text
-                        match.venue = match_dict.get('venue').text
-
-                        # convert epoch to timezone
-                        if venue_epoch:
-                            match.time = time.strftime('%H:%M',time.localtime(int(venue_epoch)))
-                        else:
-                            match.time = '00:00'
-
-                        # parse name when country comes first
-                        match.away = re.sub('^[a-z]+\s', '', match.away)
-                        match.home = re.sub('\s+[a-z]{2,3}$', '', match.home)
-
-                        home_a = match_dict.get('squad_a').find('a')
-                        away_a = match_dict.get('squad_b').find('a')
-
-                        match._home_ref = home_a.attrs.get('href')
-                        match._away_ref = away_a.attrs.get('href')
-
-                        day_matches.append(match)
-        else:
+        rsp = self._fetch(f'https://fbref.com/en/matches/{date}', 'schedule')
+
+        return self._handle_day_matches(rsp, date, competitions)
+
+    def iter_day_matches(self, date=None, competitions: list = None):
+        """Yield matches from specified date as soon as each row is read, in page order.
+
+        :params date: 'YYYY-MM-DD', today by default.
+        :params competitions: names or fbref ids of the competitions to keep, every one by default.
+        """
+        date = self._handle_date(date)
+        rsp = self._fetch(f'https://fbref.com/en/matches/{date}', 'schedule')
+
+        yield from self._iter_schedule(self._schedule_soup(rsp, competitions), date, competitions)
+
+    def matches_between(self, start, end, competitions: list = None) -> list:
+        """Return matches of every day from `start` to `end` (both included), sorted by date and time.
+
+        :params start: 'YYYY-MM-DD' or `datetime.date`.
+        :params end: 'YYYY-MM-DD' or `datetime.date`.
+        :params competitions: names or fbref ids of the competitions to keep, every one by default.
+        """
+        matches = [match for _, day_matches in self._iter_days(start, end, competitions) for match in day_matches]
+
+        # a fixture listed on two days is kept on the first one
+        return list(self._unique(sorted(matches, key=lambda match: (match.date, match.time))))
+
+    def iter_matches_between(self, start, end, competitions: list = None):
+        """Yield matches of every day from `start` to `end`, a day as soon as its page is parsed.
+
+        Schedule pages are fetched concurrently (`max_workers`), a fixture listed
+        on two days is yielded once.
+        """
+        seen = set()
+
+        for _, day_matches in self._iter_days(start, end, competitions):
+            yield from self._unique(day_matches, seen)
+
+    def _iter_days(self, start, end, competitions: list = None):
+        return iter_all(lambda date: self._day_schedule(date, competitions), self._dates(start, end), max_workers=self.max_workers)
+
+    def _unique(self, matches: list, seen: set = None):
+        seen = set() if seen is None else seen
+
+        for match in matches:
+            if match._key not in seen:
+                seen.add(match._key)
+                yield match
+
+    def _day_schedule(self, date: str, competitions: list = None) -> list:
+        rsp = self._fetch(f'https://fbref.com/en/matches/{date}', 'schedule')
+        soup = self._schedule_soup(rsp, competitions)
+
+        # ranges keep many days, fields are read now so each day's tree is released
+        with stage(self.metrics, 'extract', 'schedule'):
+            return [match._materialize() for match in self._iter_schedule(soup, date, competitions)]
+
+    def _new_match(self):
+        return ScheduledMatch(registry=self.registry, **self._options())
+
+    def _schedule_soup(self, rsp, competitions: list = None):
+        if rsp.status_code>=400:
             raise AttributeError(f"Can't collect matches. See error:\n {rsp.text}")
 
+        parse_only = SCHEDULE_ONLY if self.targeted else None
+        competitions = _competitions(competitions)
+
+        # with ids only, other competitions are not even built into the tree
+        if self.targeted and competitions and all(competition.isdigit() for competition in competitions):
+            parse_only = schedule_strainer(sorted(competitions))
+
+        # not memoized in the page cache, matches would keep every parsed day alive
+        with stage(self.metrics, 'parse', 'schedule'):
+            return make_soup(rsp.content, self.parser, parse_only)
+
+    def _handle_day_matches(self, rsp, date: str = None, competitions: list = None) -> list:
+        soup = self._schedule_soup(rsp, competitions)
+
+        with stage(self.metrics, 'extract', 'schedule'):
+            day_matches = self._handle_schedule(soup, date, competitions)
+
         return sorted(day_matches, key = lambda i: i.time)
 
+    def _handle_schedule(self, soup, date: str = None, competitions: list = None) -> list:
+        return list(self._iter_schedule(soup, date, competitions))
 
-class PreviousMatch:
-    def __init__(self) -> None:
-        self.time = str
-        self.competition = str
-        self.result = str
-        self.venue = str
-        self.opponent = str
-        self.goals_for = int
-        self.goals_against = int
-        self.formation = str
-        self.possession = str
-        self.captain = str
-        self.corners = str
-        self.shots = int
-        self.shots_on_target = int
-        self.offsides = int
-        self.fouls = int
-        self.match_summary = dict
+    def _iter_schedule(self, soup, date: str = None, competitions: list = None):
+        all_sched_tables = soup.find_all('div', attrs={'id': SCHEDULE_ID})
+        competitions = _competitions(competitions)
+
+        for sched_table in all_sched_tables:
+            competition = sched_table.find('h2').find('a').text
+            competition_id = SCHEDULE_ID.match(sched_table.attrs['id']).group(1)
+
+            # skip other competitions before reading their rows
+            if competitions is not None and competition not in competitions and competition_id not in competitions:
+                continue
+
+            tbody = sched_table.find('tbody')
+            rows = tbody.find_all('tr')
+
+            for row in rows:
+                if not row.attrs.get('class'):
+                    match = self._new_match()
+                    # set match attributes, the others are read from the row on first access
+                    match.date = date
+                    match.competition = competition
+                    match._row = schedule_cells(row)
+
+                    yield match
+
+
+def _competitions(competitions) -> set:
+    # allow-list of competition names and fbref ids, ids as text
+    if competitions is None:
+        return None
+
+    if isinstance(competitions, (str, int)):
+        competitions = [competitions]
+
+    return {str(competition) for competition in competitions}
+
+
+class FbrefDayMatches(ScheduledMatches):
+    r"""``FbrefDayMatches`` is the entry point of the package, see `ScheduledMatches`."""
 
 
 class Squad(PreviousMatchHandlers):
-    def __init__(self, name, competition, venue) -> None:
-        super().__init__()
-        self.name = re.sub('\s+[a-z]{2}$', '', name)
+    r"""``Squad`` collects the last matches of a team and summarises them.
+
+        Match reports are fetched concurrently, `max_workers` bounds the thread pool
+        and `per_host` the number of simultaneous requests to `fbref.com`.
+        See `FetchHandlers` for every fetch option.
+
+        With `columnar=True` totals and results are NumPy reductions over
+        a `HistoryFrame` instead of Python loops.
+
+    """
+    def __init__(self, name, competition, venue, columnar: bool = False, **options) -> None:
+        super().__init__(**options)
+        self.columnar = columnar
+        self.name = NAME_SUFFIX.sub('', name)
         self._competition = competition
         self._venue = venue
         self.position = None
         self.history = []
-    
-    def _per_game(self, number):
-        return round(number/len(self.history), 2)
 
-    def match_summary(self, href, previous_matches, competitions, venue) -> None:
+    @property
+    def history(self) -> list:
+        return self._history
+
+    @history.setter
+    def history(self, history: list) -> None:
+        self._history = history
+        self._aggregate = None
+
+    def _check_filters(self, competitions: str, venue: str) -> None:
         VALID_COMPETITIONS = ['all', 'same']
         VALID_VENUES = ['all', 'same']
 
@@ -129,338 +228,358 @@ class Squad(PreviousMatchHandlers):
         if venue.lower() not in VALID_VENUES:
             raise ValueError("venue: status must be one of %r." % VALID_VENUES)
 
+    def match_summary(self, href, previous_matches, competitions, venue, offline: bool = False) -> None:
+        # collect match details concurrently, history keeps the matchlog order
+        for _ in self.iter_match_summary(href=href, previous_matches=previous_matches, competitions=competitions, venue=venue, offline=offline):
+            pass
+
+    def iter_match_summary(self, href, previous_matches, competitions, venue, ordered: bool = False, offline: bool = False):
+        """Yield each `PreviousMatch` as soon as its report is parsed.
+
+        Reports are fetched concurrently and yielded as they complete, with
+        `ordered=True` in matchlog order (most recent first) instead.
+        `history` is set once every match was yielded, in matchlog order.
+        With `offline=True` matches are read from a `Warehouse` store only.
+        """
+        self._check_filters(competitions, venue)
+
         squad_url = urljoin('https://fbref.com', href)
-        previous_matches = self._handle_previous_matches(squad_url, previous_matches, competitions, venue)
-
-        for match in previous_matches:
-            previous_match = PreviousMatch()
-            previous_match.time = match.get('time').text
-            previous_match.competition = match.get('comp').text
-            previous_match.result = match.get('result').text
-            previous_match.venue = match.get('venue').text
-            previous_match.opponent = match.get('opponent').text 
-
-            # parse name when country comes first or at the end
-            previous_match.opponent = re.sub('^[a-z]+\s', '', previous_match.opponent)
-
-            previous_match.goals_for = int(match.get('goals_for').text.split(' ')[0])
-            previous_match.goals_against = int(match.get('goals_against').text.split(' ')[0])
-            previous_match.formation = match.get('formation').text
-            previous_match.possession = float(match.get('possession').text) if match.get('possession').text else None 
-            previous_match.captain = match.get('captain').text
-
-            # collect match details 
-            match_report = self._handle_match_report(
-                match_url = match.get('match_report').find('a').attrs.get('href'), 
-                venue = previous_match.venue
-            )
-            previous_match.corners = match_report['corners']
-            previous_match.shots = match_report['shots']
-            previous_match.shots_on_target = match_report['shots_on_target'] or 0
-            previous_match.offsides = match_report['offsides']
-            previous_match.fouls = match_report['fouls']
-            previous_match.match_summary = match_report['summary']
-
-            self.history.append(previous_match)
+
+        if offline:
+            yield from self._iter_warehouse_summary(squad_url, previous_matches, competitions, venue)
+            return
+
+        matchlog = self._handle_matchlog(squad_url)
+        previous_matches = self._select_previous_matches(matchlog, previous_matches, competitions, venue)
+        history = [None]*len(previous_matches)
+        match_reports = self._iter_stored_reports(squad_url, matchlog, previous_matches)
+
+        for index, match_report in in_order(match_reports) if ordered else match_reports:
+            history[index] = self._previous_match(previous_matches[index], match_report)
+            yield history[index]
+
+        self.history.extend(history)
+
+    def _iter_warehouse_summary(self, squad_url: str, previous_matches: int, competitions: str, venue: str):
+        if not hasattr(self.store, 'previous_matches'):
+            raise ValueError('offline: store must be a `Warehouse`.')
+
+        history = []
+        self.position = self.store.position(squad_url)
+        rows = self.store.previous_matches(
+            squad_url,
+            previous_matches,
+            competition=self._competition if competitions=='same' else None,
+            venue=self._venue if venue=='same' else None
+        )
+
+        for match, match_report in rows:
+            history.append(self._previous_match(match, match_report))
+            yield history[-1]
+
+        self.history.extend(history)
+
+    def index_summary(self, index, href, previous_matches, competitions, venue) -> None:
+        """Build the history from a `LeagueIndex` without any request.
+
+        Only results and goals are known, report stats are left empty and
+        `position` comes from the league table.
+        """
+        self._check_filters(competitions, venue)
+        previous_matches = self._select_previous_matches(index.matchlog(href), previous_matches, competitions, venue)
+        self._build_history(previous_matches, [EMPTY_REPORT]*len(previous_matches))
+
+    def refresh(self, href, previous_matches, competitions, venue) -> None:
+        """Collect the history again, with a `store` only new matches are fetched."""
+        self.history = []
+        self.match_summary(href=href, previous_matches=previous_matches, competitions=competitions, venue=venue)
+
+    def _build_history(self, previous_matches: list, match_reports: list) -> None:
+        for match, match_report in zip(previous_matches, match_reports):
+            self.history.append(self._previous_match(match, match_report))
+
+    def _previous_match(self, match: dict, match_report: dict) -> PreviousMatch:
+        return PreviousMatch.from_row(match, match_report)
+
+    def stats(self) -> dict:
+        """Return every statistic of the squad, computed once per history.
+
+        The result is cached and computed again when `history` changes.
+        """
+        key = (id(self._history), len(self._history))
+
+        if self._aggregate is None or self._aggregate[0]!=key:
+            with stage(self.metrics, 'aggregate', 'squad'):
+                self._aggregate = (key, aggregate(self, columnar=self.columnar))
+
+        return self._aggregate[1]
+
+    def frame(self):
+        """Return the history as a `HistoryFrame` (requires numpy)."""
+        from .columnar import HistoryFrame
+
+        return HistoryFrame.from_history(self)
+
+    def _total(self, stat: str) -> dict:
+        return dict(self.stats()[stat])
 
     def results(self) -> dict:
         """ """
-        results = {'W':0, 'L': 0, 'D': 0, 'pts_pct': 0}
-        pts = 0
-
-        if len(self.history)>0:
-            for match in self.history:
-                if match.result=='W':
-                    results['W'] +=1
-                    pts+=3
-                
-                if match.result=='L':
-                    results['L'] +=1
-                
-                if match.result=='D':
-                    results['D'] +=1
-                    pts+=1
-
-                results['pts_pct'] = round((pts/(len(self.history)*3))*100,0)
-    
-        return results 
+        return dict(self.stats()['results'])
 
     def corners(self) -> dict:
         """ """
-        total = 0
-        avg = 0.0
-
-        if len(self.history)>0:
-            for match in self.history:
-                if match.corners:
-                    total+=match.corners
-            
-            avg = self._per_game(total)
-
-        return {'total': total, 'avg': avg}
+        return self._total('corners')
 
     def fouls(self) -> dict:
         """ """
-        total = 0
-        avg = 0.0
-
-        if len(self.history)>0:
-            for match in self.history:
-                if match.fouls:
-                    total+=match.fouls
-            
-            avg = self._per_game(total)
-
-        return {'total': total, 'avg': avg}
+        return self._total('fouls')
 
     def offsides(self) -> dict:
         """ """
-        total = 0
-        avg = 0.0
+        return self._total('offsides')
 
-        if len(self.history)>0:
-            for match in self.history:
-                if match.offsides:
-                    total+=match.offsides
-            
-            avg = self._per_game(total)
-
-        return {'total': total, 'avg': avg}
-        
     def shots(self) -> dict:
         """ """
-        total = 0
-        avg = 0.0
+        return self._total('shots')
 
-        if len(self.history)>0:
-            for match in self.history:
-                if match.shots:
-                    total+=match.shots
-            
-            avg = self._per_game(total)
-
-        return {'total': total, 'avg': avg}
-        
     def shots_on_target(self) -> dict:
         """ """
-        total = 0
-        avg = 0.0
+        return self._total('shots_on_target')
 
-        if len(self.history)>0:
-            for match in self.history:
-                if match.shots_on_target:
-                    total+=match.shots_on_target
-            
-            avg = self._per_game(total)
-
-        return {'total': total, 'avg': avg}
-        
     def goals_for(self) -> dict:
         """ """
-        total = 0
-        avg = 0.0
-
-        if len(self.history)>0:
-            for match in self.history:
-                if match.goals_for:
-                    total+=match.goals_for
-            
-            avg = self._per_game(total)
-
-        return {'total': total, 'avg': avg}
+        return self._total('goals_for')
 
     def shots_to_goal(self) -> float:
-        goals = 0 
-        shots_on_target = 0
-
-        if len(self.history)>0:
-            for match in self.history:
-                goals+=match.goals_for
-                shots_on_target+=match.shots_on_target
-        try:
-            return round(shots_on_target/goals,2)
-        except ZeroDivisionError:
-            return 0.0
+        return self.stats()['shots_to_goal']
 
     def goals_against(self) -> dict:
         """ """
-        total = 0
-        avg = 0.0
-
-        if len(self.history)>0:
-            for match in self.history:
-                if match.goals_against:
-                    total+=match.goals_against
-            
-            avg = self._per_game(total)
+        return self._total('goals_against')
 
-        return {'total': total, 'avg': avg}
-
-        
     def clean_sheets(self) -> int:
         """ """
-        total = 0
-
-        if len(self.history)>0:
-            for match in self.history:
-                if match.goals_against==0:
-                    total+=1
-
-        return total
+        return self.stats()['clean_sheets']
 
     def possible_card(self) -> str:
-        cards = []
-
-        if len(self.history)>0:
-            for match in self.history:
-                match_summary = match.match_summary
-                cards.extend([x['player'] if x['eventtype']=='Yellow' else None for x in match_summary])
-
-            card_players = Counter(cards)
-            card_players.pop(None, None)
-            
-            if len(card_players)>0 and card_players.most_common(1)[0][1]>1:
-                return f'{card_players.most_common(1)[0][0]} [{card_players.most_common(1)[0][1]}]'
-        
-        return ''
+        return self.stats()['possible_card']
 
     def possible_striker(self) -> str:
-        goals = []
-        if len(self.history)>0:
-            for match in self.history:
-                match_summary = match.match_summary
-                goals.extend([x['player'] if x['eventtype']=='Goal' else None for x in match_summary])
-                
-            strikers = Counter(goals)
-            strikers.pop(None, None)
-
-            if len(strikers)>0 and strikers.most_common(1)[0][1]>1:
-                return f'{strikers.most_common(1)[0][0]} [{strikers.most_common(1)[0][1]}]'
-        
-        return ''
-            
-    def cards(self) -> int:
-        events = []
-        results = 0
-        
-        if len(self.history)>0:
-            for match in self.history:
-                match_summary = match.match_summary
-                events.extend([x['eventtype'] for x in match_summary])
+        return self.stats()['possible_striker']
 
-            results = self._per_game(events.count('Yellow'))
-        
-        return results
+    def cards(self) -> int:
+        return self.stats()['cards']
 
     def cards_half(self) -> dict:
-        half = {'first': 0, 'second': 0}
-        events = []
+        return dict(self.stats()['cards_half'])
 
-        if len(self.history)>0:
-            for match in self.history:
-                match_summary = match.match_summary
-                card_events = filter(lambda x: True if x['eventtype'] in ['Yellow','Red'] else False, match_summary)
-                events.extend(list(card_events))
+    def goals_half(self) -> dict:
+        return dict(self.stats()['goals_half'])
 
-            first_half = list(filter(self._handle_first_half, events))
-            second_half = list(filter(self._handle_second_half, events))
+    def to_dict(self) -> list:
+        return [match.to_dict() for match in self.history]
 
-            half['first'] = self._per_game(len(first_half))
-            half['second'] = self._per_game(len(second_half))
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
 
-        return half
+    def to_csv(self, path: str) -> None:
+        """Write the history to `path`, events as a JSON string. See `export.CsvWriter` for many squads."""
+        with open(path, 'w', newline='') as csvfile:
+            writer = csv.writer(csvfile)
 
-    def goals_half(self) -> dict:
-        half = {'first': 0, 'second': 0}
-        events = []
+            writer.writerow(FIELDS)
+            writer.writerows(match_row(match) for match in self.history)
 
-        if len(self.history)>0:
-            for match in self.history:
-                match_summary = match.match_summary
-                goal_events = filter(lambda x: True if x['eventtype']=='Goal' else False, match_summary)
-                events.extend(list(goal_events))
 
-            first_half = list(filter(self._handle_first_half, events))
-            second_half = list(filter(self._handle_second_half, events))
+class SquadRegistry(object):
+    r"""``SquadRegistry`` hands out `Squad` objects, collecting each page only once.
 
-            half['first'] = self._per_game(len(first_half))
-            half['second'] = self._per_game(len(second_half))
+        Squads are kept by `(href, previous_matches, competitions, venue)`, with 'same'
+        filters resolved to the competition and side of the fixture. Matchlogs and
+        parsed match reports (both sides from one parse) are kept too, so another
+        view of a squad (e.g. `venue='same'` after `venue='all'`) is derived from the
+        matches already loaded and only fetches the reports it does not have yet.
+        With a `store`, stored reports are used first and new ones saved. The memos
+        are shared with `aio.AsyncSquadRegistry`.
 
-        return half
+        See following example:
 
-    def to_dict(self) -> list:
-        
-        team_history = []
-
-        for match in self.history:
-            team_history.append({
-                'time': match.time,
-                'competition': match.competition,
-                'result': match.result,
-                'venue': match.venue,
-                'opponent': match.opponent,
-                'goals_for': match.goals_for,
-                'goals_against': match.goals_against,
-                'formation': match.formation,
-                'possession': match.possession,
-                'captain': match.captain,
-                'corners': match.corners,
-                'shots': match.shots,
-                'shots_on_target': match.shots_on_target,
-                'offsides': match.offsides,
-                'fouls': match.fouls,
-                'match_summary': match.match_summary
-            })
-        
-        return team_history
+            registry = SquadRegistry(max_workers=8)
 
-    def to_json(self) -> str:
-        
-        team_history = []
-
-        for match in self.history:
-            team_history.append({
-                'time': match.time,
-                'competition': match.competition,
-                'result': match.result,
-                'venue': match.venue,
-                'opponent': match.opponent,
-                'goals_for': match.goals_for,
-                'goals_against': match.goals_against,
-                'formation': match.formation,
-                'possession': match.possession,
-                'captain': match.captain,
-                'corners': match.corners,
-                'shots': match.shots,
-                'shots_on_target': match.shots_on_target,
-                'offsides': match.offsides,
-                'fouls': match.fouls,
-                'match_summary': match.match_summary
-            })
-        
-        return json.dumps(team_history)
+            squad = registry.squad('Arsenal', 'Premier League', 'Home', href, previous_matches=5, competitions='all', venue='same')
 
-    def to_csv(self, path: str) -> None:
+    """
+    def __init__(self, **options) -> None:
+        self.options = options
+        self._lock = threading.Lock()
+        self._handlers = None
+        self._squads = {}
+        self._matchlogs = {}
+        self._reports = {}
+
+    @staticmethod
+    def key(href: str, previous_matches: int, competitions: str, venue: str, competition: str, side: str) -> tuple:
+        return (href, previous_matches, competition if competitions=='same' else competitions, side if venue=='same' else venue)
+
+    def _memo(self, memo: dict, key, func):
+        # the first caller computes the value, concurrent callers wait for it
+        with self._lock:
+            future = memo.get(key)
+            owner = future is None
+
+            if owner:
+                future = memo[key] = Future()
+
+        if owner:
+            try:
+                future.set_result(func())
+            except BaseException as error:
+                with self._lock:
+                    del memo[key]
+                future.set_exception(error)
+
+        return future.result()
+
+    @property
+    def handlers(self) -> PreviousMatchHandlers:
+        """Fetch handlers shared by every squad of the registry, one per-host limit for all of them."""
+        with self._lock:
+            if self._handlers is None:
+                self._handlers = PreviousMatchHandlers(**self.options)
+
+            return self._handlers
+
+    def get(self, key: tuple):
+        """Return the squad registered under `key`, or None."""
+        with self._lock:
+            future = self._squads.get(key)
+
+        if future is not None and future.done() and future.exception() is None:
+            return future.result()
+
+        return None
+
+    def clear(self) -> None:
+        with self._lock:
+            for memo in (self._squads, self._matchlogs, self._reports):
+                memo.clear()
+
+    def matchlog(self, squad_url: str) -> dict:
+        """Return the matchlog of a squad page, fetched once."""
+        return self._memo(self._matchlogs, squad_url, lambda: self.handlers._handle_matchlog(squad_url))
+
+    def report(self, match_url: str, side: str) -> dict:
+        """Return one side of a match report, the page is fetched and parsed once for both sides."""
+        return self._memo(self._reports, match_url, lambda: self._report_sides(match_url))[side]
+
+    def _report_sides(self, match_url: str) -> dict:
+        # the response is dropped once parsed, only the reports are kept
+        return self.handlers._handle_report_sides(self.handlers._fetch(urljoin('https://fbref.com/', match_url), 'report'))
+
+    def squad(self, name: str, competition: str, side: str, href: str, previous_matches: int, competitions: str, venue: str) -> Squad:
+        """Return the squad with its history collected, built on first use."""
+        key = self.key(href, previous_matches, competitions, venue, competition, side)
+
+        return self._memo(self._squads, key, lambda: self._build(name, competition, side, href, previous_matches, competitions, venue))
+
+    def _build(self, name, competition, side, href, previous_matches, competitions, venue) -> Squad:
+        squad = Squad(name=name, competition=competition, venue=side, **self.options)
+        squad._check_filters(competitions, venue)
+        squad_url = urljoin('https://fbref.com', href)
+        matchlog = self.matchlog(squad_url)
+        previous_matches = squad._select_previous_matches(matchlog, previous_matches, competitions, venue)
+        squad._build_history(previous_matches, self._squad_reports(squad, squad_url, matchlog, previous_matches))
 
-        data = self.to_dict()
-        with open(path, 'w', newline='') as csvfile:
-            fieldnames = data[0].keys()
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        return squad
+
+    def _squad_reports(self, squad: Squad, squad_url: str, matchlog: dict, previous_matches: list) -> list:
+        refs = squad._report_refs(previous_matches)
+        known = squad.store.load(squad_url) if squad.store is not None else {}
+        stored = [(known.get(match_url) or {}).get('report') for match_url, _ in refs]
+        match_reports = fetch_all(
+            lambda index: stored[index] if stored[index] is not None else self.report(*refs[index]),
+            list(range(len(refs))),
+            max_workers=squad.max_workers
+        )
 
-            writer.writeheader()
-            writer.writerows(data)
+        if squad.store is not None:
+            collected = {refs[index][0]: match_reports[index] for index in range(len(refs)) if stored[index] is None}
+            squad.store.save(squad_url, matchlog['rows'], collected, position=matchlog['position'], name=squad.name)
+
+        return match_reports
+
+
+class _RowField(object):
+    # field of a `ScheduledMatch` read from its schedule row on first access, kept in its own slot
+    def __init__(self, extract, default=str) -> None:
+        self.extract = extract
+        self.default = default
+
+    def __set_name__(self, owner, name: str) -> None:
+        self.name = name
+        self.slot = f'{name}_'
+
+    def __get__(self, match, owner=None):
+        if match is None:
+            return self
+
+        try:
+            return getattr(match, self.slot)
+        except AttributeError:
+            value = self.extract(match._row) if match._row is not None else self.default
+            setattr(match, self.slot, value)
+            match._release()
+
+            return value
+
+    def __set__(self, match, value) -> None:
+        setattr(match, self.slot, value)
 
 
 class ScheduledMatch:
-    def __init__(self) -> None:
+    # fields read lazily from the schedule row, see `_RowField`
+    FIELDS = ('home', 'away', 'score', 'time', 'venue', '_home_ref', '_away_ref', '_kickoff')
+
+    __slots__ = (
+        'date', 'competition', '_row', '_registry', '_options', *(f'{field}_' for field in FIELDS)
+    )
+
+    home = _RowField(SCHEDULE_FIELDS['home'])
+    away = _RowField(SCHEDULE_FIELDS['away'])
+    score = _RowField(SCHEDULE_FIELDS['score'])
+    time = _RowField(SCHEDULE_FIELDS['time'])
+    venue = _RowField(SCHEDULE_FIELDS['venue'])
+    _home_ref = _RowField(SCHEDULE_FIELDS['_home_ref'])
+    _away_ref = _RowField(SCHEDULE_FIELDS['_away_ref'])
+    _kickoff = _RowField(kickoff_epoch, default=None)
+
+    def __init__(self, registry: SquadRegistry = None, **options) -> None:
+        self.date = str
         self.competition = str
-        self.home = str
-        self.away = str
-        self.score = str
-        self.time = str
-        self.venue = str
-        self._home_ref = str
-        self._away_ref = str
+        # cells of the schedule row, dropped once every field was read from them
+        self._row = None
+        # squads already collected, shared with the other matches of the day
+        self._registry = registry or SquadRegistry(**options)
+        # fetch options handed to squads
+        self._options = options
+
+    def _release(self) -> None:
+        # the cells hold the whole schedule tree through their parents
+        if self._row is not None and all(hasattr(self, f'{field}_') for field in self.FIELDS):
+            self._row = None
+
+    def _materialize(self):
+        """Read every field, the schedule row is released."""
+        for field in self.FIELDS:
+            getattr(self, field)
+
+        return self
+
+    @property
+    def _key(self) -> tuple:
+        # the same fixture may be listed on two days, its kickoff tells them apart
+        return (self.competition, self._home_ref, self._away_ref, self._kickoff or self.date)
 
     def display(self) -> str:
         return f"""=====************=====
@@ -475,24 +594,22 @@ class ScheduledMatch:
 
         :params previous_matches: number of matches to considerate on summary.
         """
-        squad = Squad(name=self.home, competition=self.competition, venue='Home')
-        squad.match_summary(href=self._home_ref, previous_matches=previous_matches, competitions=competitions, venue=venue)
-
-        return squad
+        return self._registry.squad(self.home, self.competition, 'Home', self._home_ref, previous_matches, competitions, venue)
     
     def away_stats(self, previous_matches: int, competitions: str, venue: str) -> Squad:
         """Return statistics from Away team last N `~previous_matches` games.
 
         :params previous_matches: number of matches to considerate on summary.
         """
-        squad = Squad(name=self.away, competition=self.competition, venue='Away')
-        squad.match_summary(href=self._away_ref, previous_matches=previous_matches, competitions=competitions, venue=venue)
-
-        return squad
+        return self._registry.squad(self.away, self.competition, 'Away', self._away_ref, previous_matches, competitions, venue)
     
     def describe2(self, previous_matches: int) -> str:
         home = self.home_stats(previous_matches=previous_matches, competitions='all', venue='all')
         away = self.away_stats(previous_matches=previous_matches, competitions='all', venue='all')
+
+        return self._describe2(home, away)
+
+    def _describe2(self, home: Squad, away: Squad) -> str:
         home_results = home.results()
         away_results = away.results()
 
@@ -547,6 +664,10 @@ class ScheduledMatch:
     def describe(self, previous_matches: int) -> str:
         home = self.home_stats(previous_matches=previous_matches, competitions='all', venue='same')
         away = self.away_stats(previous_matches=previous_matches, competitions='all', venue='same')
+
+        return self._describe(home, away)
+
+    def _describe(self, home: Squad, away: Squad) -> str:
         home_results = home.results()
         away_results = away.results()
 
@@ -0,0 +1,228 @@
+import os
+import csv
+import json
+from abc import ABC, abstractmethod
+from dataclasses import fields
+from .models import Event, PreviousMatch
+
+# pyarrow takes longer to import than the whole package, it is loaded by the writers using it
+pa = None
+pq = None
+
+FIELDS = tuple(field.name for field in fields(PreviousMatch))
+# every field but the events, which have a table of their own
+MATCH_FIELDS = tuple(field for field in FIELDS if field!='match_summary')
+EVENT_FIELDS = Event._fields
+# rows are keyed by squad name and position in its history, 0 being the most recent match
+KEY_FIELDS = ('squad', 'match')
+INTEGERS = ('goals_for', 'goals_against', 'corners', 'shots', 'shots_on_target', 'offsides', 'fouls')
+FLOATS = ('possession',)
+
+
+def _import_pyarrow() -> bool:
+    global pa, pq
+
+    if pa is None:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            return False
+
+        pa, pq = pyarrow, pyarrow.parquet
+
+    return True
+
+
+def match_row(match: PreviousMatch) -> list:
+    """Return the values of `FIELDS` for a match, events as a JSON string."""
+    return [getattr(match, field) for field in MATCH_FIELDS] + [json.dumps([event.to_dict() for event in match.match_summary])]
+
+
+def _squad_rows(squad, events: bool):
+    for index, match in enumerate(squad.history):
+        row = [squad.name, index] + [getattr(match, field) for field in MATCH_FIELDS]
+
+        if events:
+            row.append([event.to_dict() for event in match.match_summary])
+
+        yield row
+
+
+def _event_rows(squad):
+    for index, match in enumerate(squad.history):
+        for event in match.match_summary:
+            yield [squad.name, index, event.minute, str(event.eventtype), event.player]
+
+
+class HistoryWriter(ABC):
+    r"""``HistoryWriter`` streams the histories of many squads to disk, one squad at a time.
+
+        Matches go to `path`, one row per `PreviousMatch` keyed by `squad` and `match`
+        (position in the history). With `events_path` events are written there as a
+        separate table with the same key, otherwise they are kept in a `match_summary`
+        column.
+
+        See following example:
+
+            with JsonlWriter('matches.jsonl', events_path='events.jsonl') as writer:
+                for match in matches.day_matches('YYYY-MM-DD'):
+                    writer.write(match.home_stats(previous_matches=7, competitions='all', venue='all'))
+
+    """
+    def __init__(self, path: str, events_path: str = None) -> None:
+        self.path = path
+        self.events_path = events_path
+        self.rows = 0
+
+    def _match_fields(self) -> tuple:
+        return KEY_FIELDS + MATCH_FIELDS + (() if self.events_path else ('match_summary',))
+
+    @abstractmethod
+    def write(self, squad) -> None:
+        """Write the history of one `Squad`."""
+
+    def write_all(self, squads) -> None:
+        """Write the history of every `Squad` of an iterable, e.g. a generator."""
+        for squad in squads:
+            self.write(squad)
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class JsonlWriter(HistoryWriter):
+    r"""``JsonlWriter`` appends one JSON object per match (and per event) to JSON Lines files."""
+    def __init__(self, path: str, events_path: str = None, mode: str = 'a') -> None:
+        super().__init__(path, events_path)
+        self._file = open(path, mode)
+        self._events = open(events_path, mode) if events_path else None
+
+    def write(self, squad) -> None:
+        keys = self._match_fields()
+
+        for row in _squad_rows(squad, events=self._events is None):
+            self._file.write(json.dumps(dict(zip(keys, row)))+'\n')
+            self.rows += 1
+
+        if self._events:
+            for row in _event_rows(squad):
+                self._events.write(json.dumps(dict(zip(KEY_FIELDS+EVENT_FIELDS, row)))+'\n')
+
+    def close(self) -> None:
+        self._file.close()
+
+        if self._events:
+            self._events.close()
+
+
+class CsvWriter(HistoryWriter):
+    r"""``CsvWriter`` appends matches (and events) to CSV files, the header is written to new files only.
+
+        Without `events_path` the `match_summary` column holds the events as a JSON string.
+
+    """
+    def __init__(self, path: str, events_path: str = None, mode: str = 'a') -> None:
+        super().__init__(path, events_path)
+        self._file, self._writer = self._open(path, mode, self._match_fields())
+        self._events, self._events_writer = self._open(events_path, mode, KEY_FIELDS+EVENT_FIELDS) if events_path else (None, None)
+
+    def _open(self, path: str, mode: str, header: tuple) -> tuple:
+        new = mode=='w' or not os.path.exists(path) or os.path.getsize(path)==0
+        csvfile = open(path, mode, newline='')
+        writer = csv.writer(csvfile)
+
+        if new:
+            writer.writerow(header)
+
+        return csvfile, writer
+
+    def write(self, squad) -> None:
+        for row in _squad_rows(squad, events=self._events is None):
+            if self._events is None:
+                row[-1] = json.dumps(row[-1])
+
+            self._writer.writerow(row)
+            self.rows += 1
+
+        if self._events:
+            self._events_writer.writerows(_event_rows(squad))
+
+    def close(self) -> None:
+        self._file.close()
+
+        if self._events:
+            self._events.close()
+
+
+class ParquetWriter(HistoryWriter):
+    r"""``ParquetWriter`` streams matches (and events) to Parquet files with typed columns (requires pyarrow).
+
+        Rows are buffered up to `batch_size` and written as one row group, the files
+        are complete once the writer is closed. Without `events_path` events are a
+        `list<struct>` column.
+
+    """
+    def __init__(self, path: str, events_path: str = None, batch_size: int = 10000) -> None:
+        if not _import_pyarrow():
+            raise ImportError(f'{type(self).__name__} requires pyarrow, install it with `pip install pyarrow`.')
+
+        super().__init__(path, events_path)
+        self.batch_size = batch_size
+        self.schema = self._match_schema()
+        self.events_schema = pa.schema([(field, pa.string() if field!='match' else pa.int32()) for field in KEY_FIELDS+EVENT_FIELDS])
+        self._writer = self._open(path, self.schema)
+        self._events_writer = self._open(events_path, self.events_schema) if events_path else None
+        self._buffer = []
+        self._events_buffer = []
+
+    def _match_schema(self):
+        event = pa.struct([(field, pa.string()) for field in EVENT_FIELDS])
+        types = {'squad': pa.string(), 'match': pa.int32(), 'match_summary': pa.list_(event)}
+        types.update({field: pa.int64() for field in INTEGERS})
+        types.update({field: pa.float64() for field in FLOATS})
+
+        return pa.schema([(field, types.get(field, pa.string())) for field in self._match_fields()])
+
+    def _open(self, path: str, schema):
+        return pq.ParquetWriter(path, schema)
+
+    def _flush(self, writer, rows: list, schema) -> None:
+        if rows:
+            columns = zip(*rows)
+            writer.write_batch(pa.record_batch([pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema))
+            rows.clear()
+
+    def write(self, squad) -> None:
+        for row in _squad_rows(squad, events=self._events_writer is None):
+            self._buffer.append(row)
+            self.rows += 1
+
+        if self._events_writer:
+            self._events_buffer.extend(_event_rows(squad))
+
+        if len(self._buffer)>=self.batch_size:
+            self._flush(self._writer, self._buffer, self.schema)
+
+        if len(self._events_buffer)>=self.batch_size:
+            self._flush(self._events_writer, self._events_buffer, self.events_schema)
+
+    def close(self) -> None:
+        self._flush(self._writer, self._buffer, self.schema)
+        self._writer.close()
+
+        if self._events_writer:
+            self._flush(self._events_writer, self._events_buffer, self.events_schema)
+            self._events_writer.close()
+
+
+class ArrowWriter(ParquetWriter):
+    r"""``ArrowWriter`` streams matches (and events) to Arrow IPC files, same layout as `ParquetWriter`."""
+    def _open(self, path: str, schema):
+        return pa.ipc.new_file(path, schema)
@@ -0,0 +1,326 @@
+import re
+import time
+from bs4 import BeautifulSoup, SoupStrainer
+from .metrics import stage
+from .models import COUNTRY_PREFIX, Event, EventType
+
+# `BeautifulSoup` backend, 'lxml' is a faster option when it is installed
+PARSER = 'html.parser'
+
+# patterns compiled once per process, extraction runs them for every row and event
+# schedule tables, e.g. 'all_sched_9' or 'all_sched_9_1', the group is the competition id
+SCHEDULE_ID = re.compile(r'^all_sched_(\d+)')
+POSITION = re.compile(r'(\d+)[a-z]{2}')
+STATS_CLEANER = re.compile(r'<.*?>|/|\n|\t|\xa0|—|\d+%|%|&([a-z0-9]+|#[0-9]{1,6}|#x[0-9a-f]{a,6});')
+EVENT_CLEANER = re.compile(r'<.*?>|/|\n|\t|\xa0|&([a-z0-9]+|#[0-9]{1,6}|#x[0-9a-f]{a,6});')
+MINUTE_SUFFIX = re.compile('’.+')
+# country codes around squad names, e.g. 'eng Arsenal' or 'Barcelona es', see `models.COUNTRY_PREFIX`
+COUNTRY_SUFFIX = re.compile(r'\s+[a-z]{2,3}$')
+NAME_SUFFIX = re.compile(r'\s+[a-z]{2}$')
+# goals of a league fixture, e.g. '2–1' or '(4) 1–1 (3)'
+SCORE = re.compile(r'(\d+)\s*[–-]\s*(\d+)')
+
+# subtrees needed from each page, the rest of the document is never built
+SCHEDULE_ONLY = SoupStrainer('div', attrs={'id': SCHEDULE_ID})
+SQUAD_ONLY = SoupStrainer(['div', 'table'], attrs={'id': ['meta', 'matchlogs_for']})
+LEAGUE_SCHEDULE_ONLY = SoupStrainer('table', attrs={'id': re.compile('^sched_')})
+LEAGUE_TABLE_ONLY = SoupStrainer('table', attrs={'id': re.compile('^results.*_overall$')})
+MATCH_REPORT_ONLY = SoupStrainer('div', attrs={'id': ['team_stats', 'team_stats_extra', 'events_wrap']})
+
+
+def make_soup(content: bytes, parser: str = None, parse_only: SoupStrainer = None) -> BeautifulSoup:
+    """Build a tree from html.
+
+    :params parser: `BeautifulSoup` backend, defaults to `PARSER`.
+    :params parse_only: `SoupStrainer` restricting the tree to the needed subtrees.
+    """
+    return BeautifulSoup(content, parser or PARSER, parse_only=parse_only)
+
+
+def schedule_strainer(competition_ids: list) -> SoupStrainer:
+    """Return a `SoupStrainer` building only the schedule tables of some competitions.
+
+    :params competition_ids: fbref competition ids, e.g. `['9', '12']`.
+    """
+    ids = '|'.join(re.escape(str(competition_id)) for competition_id in competition_ids)
+
+    # same ids as `SCHEDULE_ID`, suffixed tables included but not longer ids ('9' is not '90')
+    return SoupStrainer('div', attrs={'id': re.compile(rf'^all_sched_({ids})(?!\d)')})
+
+
+def schedule_cells(row) -> dict:
+    """Return the cells of a schedule row by `data-stat`."""
+    return {stat.attrs['data-stat']: stat for stat in row.find_all('td')}
+
+
+def kickoff_epoch(cells: dict) -> str:
+    try:
+        return cells.get('time').next_element.get('data-venue-epoch')
+    except AttributeError:
+        return None
+
+
+def _kickoff(cells: dict) -> str:
+    venue_epoch = kickoff_epoch(cells)
+
+    # convert epoch to timezone
+    if venue_epoch:
+        return time.strftime('%H:%M',time.localtime(int(venue_epoch)))
+
+    return '00:00'
+
+
+# fields of a scheduled match read from the cells of its row
+SCHEDULE_FIELDS = {
+    'home': lambda cells: COUNTRY_SUFFIX.sub('', cells.get('squad_a').text),
+    'away': lambda cells: COUNTRY_PREFIX.sub('', cells.get('squad_b').text),
+    'score': lambda cells: cells.get('score').text,
+    'time': _kickoff,
+    'venue': lambda cells: cells.get('venue').text,
+    '_home_ref': lambda cells: cells.get('squad_a').find('a').attrs.get('href'),
+    '_away_ref': lambda cells: cells.get('squad_b').find('a').attrs.get('href')
+}
+
+
+def extract_league_schedule(content: bytes, parser: str = None, targeted: bool = True, metrics=None) -> list:
+    """Return every fixture of a competition schedule page, in page order.
+
+    Fixtures are plain dicts with date, time, squads and their hrefs, venue, the
+    match report href and goals (None when the match was not played).
+
+    :params content: competition schedule page html.
+    :params parser: `BeautifulSoup` backend, defaults to `PARSER`.
+    :params targeted: parse only the schedule table.
+    :params metrics: optional `Metrics` timing the parse and extract stages.
+    """
+    with stage(metrics, 'parse', 'schedule'):
+        soup = make_soup(content, parser, LEAGUE_SCHEDULE_ONLY if targeted else None)
+
+    with stage(metrics, 'extract', 'schedule'):
+        return _league_schedule(soup)
+
+
+def _league_schedule(soup: BeautifulSoup) -> list:
+    fixtures = []
+    table = soup.find('table', attrs={'id': re.compile('^sched_')})
+
+    for row in table.find('tbody').find_all('tr') if table else []:
+        cells = {stat.attrs['data-stat']: stat for stat in row.find_all(['th', 'td'], attrs={'data-stat': True})}
+
+        if row.attrs.get('class') or not cells.get('home_team') or not cells['home_team'].find('a'):
+            continue
+
+        score = SCORE.search(cells['score'].text) if cells.get('score') else None
+        match_report = cells['match_report'].find('a') if cells.get('match_report') else None
+
+        fixtures.append({
+            'date': cells['date'].text if cells.get('date') else None,
+            'time': cells['start_time'].text if cells.get('start_time') else None,
+            'home': cells['home_team'].text.strip(),
+            'home_ref': cells['home_team'].find('a').attrs.get('href'),
+            'away': cells['away_team'].text.strip(),
+            'away_ref': cells['away_team'].find('a').attrs.get('href'),
+            'home_goals': int(score[1]) if score else None,
+            'away_goals': int(score[2]) if score else None,
+            'venue': cells['venue'].text if cells.get('venue') else None,
+            'match_report': match_report.attrs.get('href') if score and match_report else None
+        })
+
+    return fixtures
+
+
+def extract_league_table(content: bytes, parser: str = None, targeted: bool = True, metrics=None) -> list:
+    """Return the rows of a competition league table, each with its squad href and position (e.g. '1st').
+
+    :params content: competition stats page html.
+    :params parser: `BeautifulSoup` backend, defaults to `PARSER`.
+    :params targeted: parse only the overall league table.
+    :params metrics: optional `Metrics` timing the parse and extract stages.
+    """
+    with stage(metrics, 'parse', 'schedule'):
+        soup = make_soup(content, parser, LEAGUE_TABLE_ONLY if targeted else None)
+
+    with stage(metrics, 'extract', 'schedule'):
+        return _league_table(soup)
+
+
+def _league_table(soup: BeautifulSoup) -> list:
+    rows = []
+    table = soup.find('table', attrs={'id': re.compile('^results.*_overall$')})
+
+    for row in table.find('tbody').find_all('tr') if table else []:
+        team = row.find('td', attrs={'data-stat': 'team'})
+
+        if row.attrs.get('class') or not team or not team.find('a'):
+            continue
+
+        table_row = {stat.attrs['data-stat']: stat.text for stat in row.find_all(['th', 'td'], attrs={'data-stat': True})}
+        table_row['squad_ref'] = team.find('a').attrs.get('href')
+        table_row['position'] = _ordinal(int(table_row['rank'])) if table_row.get('rank', '').isdigit() else ''
+        rows.append(table_row)
+
+    return rows
+
+
+def _ordinal(rank: int) -> str:
+    if 10<=rank%100<=20:
+        return f'{rank}th'
+
+    return f"{rank}{ {1: 'st', 2: 'nd', 3: 'rd'}.get(rank%10, 'th') }"
+
+
+def extract_matchlog(content: bytes, parser: str = None, targeted: bool = True, metrics=None) -> dict:
+    """Return league position and matchlog rows from a squad page.
+
+    Each row is a plain dict of `data-stat` -> text (date included), except
+    `match_report` which holds the report href.
+
+    :params content: squad page html.
+    :params parser: `BeautifulSoup` backend, defaults to `PARSER`.
+    :params targeted: parse only the record and the matchlog table.
+    :params metrics: optional `Metrics` timing the parse and extract stages.
+    """
+    with stage(metrics, 'parse', 'squad'):
+        soup = make_soup(content, parser, SQUAD_ONLY if targeted else None)
+
+    with stage(metrics, 'extract', 'squad'):
+        return _matchlog(soup)
+
+
+def _matchlog(soup: BeautifulSoup) -> dict:
+    matchlog = {'position': None, 'rows': []}
+    record = soup.find('strong', text='Record:')
+    matchlogs = soup.find('table', attrs={'id': 'matchlogs_for'})
+
+    if matchlogs:
+        matchlogs_table = matchlogs.find('tbody')
+        rows = matchlogs_table.find_all('tr')
+
+        try:
+            matchlog['position'] = POSITION.search(record.next_sibling)[0] if record else ''
+        except TypeError:
+            matchlog['position'] = ''
+
+        for row in rows:
+            data = row.find_all(['th', 'td'], attrs={'data-stat': True})
+            match_dict = {stat.attrs['data-stat']: stat.text for stat in data}
+            match_report = row.find('td', attrs={'data-stat': 'match_report'})
+            match_report = match_report.find('a') if match_report else None
+            match_dict['match_report'] = match_report.attrs.get('href') if match_report else None
+            matchlog['rows'].append(match_dict)
+
+    return matchlog
+
+
+def extract_match_report(content: bytes, venue: str, parser: str = None, targeted: bool = True, metrics=None) -> dict:
+    """Return shots, corners, fouls, offsides and events of one side of a match report.
+
+    :params content: match report html.
+    :params venue: 'Home' or 'Away', side of the report to collect.
+    :params parser: `BeautifulSoup` backend, defaults to `PARSER`.
+    :params targeted: parse only `#team_stats`, `#team_stats_extra` and `#events_wrap`.
+    :params metrics: optional `Metrics` timing the parse and extract stages.
+    """
+    with stage(metrics, 'parse', 'report'):
+        soup = make_soup(content, parser, MATCH_REPORT_ONLY if targeted else None)
+
+    with stage(metrics, 'extract', 'report'):
+        return _match_report(soup, venue)
+
+
+def extract_match_reports(content: bytes, parser: str = None, targeted: bool = True, metrics=None) -> dict:
+    """Return both sides of a match report from one parse, `{'Home': report, 'Away': report}`.
+
+    See `extract_match_report` for each side.
+    """
+    with stage(metrics, 'parse', 'report'):
+        soup = make_soup(content, parser, MATCH_REPORT_ONLY if targeted else None)
+
+    with stage(metrics, 'extract', 'report'):
+        return {venue: _match_report(soup, venue) for venue in ('Home', 'Away')}
+
+
+def _match_report(soup: BeautifulSoup, venue: str) -> dict:
+    match_report = {
+        'shots': None,
+        'shots_on_target': None,
+        'corners': None,
+        'offsides': None,
+        'fouls': None,
+        'summary': []
+    }
+    venue_event_class = 'a' if venue=='Home' else 'b'
+
+    team_stats = soup.find('div', attrs={'id': 'team_stats'})
+
+    # Shots on Target
+    shots_on_target = team_stats.find('tr', text='Shots on Target')
+
+    if shots_on_target:
+        i = 0 if venue=='Home' else 1
+        shot_values = shots_on_target.find_next('tr')
+        team_shot = shot_values.find_all('td')[i]
+
+        shots_text = team_shot.find('div').find('div').text
+        # clean simbols and accuracy of text
+        shots_text = STATS_CLEANER.sub('', shots_text)
+        match_report['shots'] = int(shots_text.split(' of ')[1])
+        match_report['shots_on_target'] = int(STATS_CLEANER.sub('', shots_text.split(' of ')[0]))
+
+    team_stats_extra = soup.find('div', attrs={'id': 'team_stats_extra'})
+
+    if team_stats_extra:
+        has_fouls = team_stats_extra.find('div', text='Fouls')
+        has_corners = team_stats_extra.find('div', text='Corners')
+        has_offsides = team_stats_extra.find('div', text='Offsides')
+        fouls = None
+        corners = None
+        offsides = None
+
+        if venue=='Home':
+            fouls = int(has_fouls.find_previous('div').text) if has_fouls else None
+            corners = int(has_corners.find_previous('div').text) if has_corners else None
+            offsides = int(has_offsides.find_previous('div').text) if has_offsides else None
+
+        if venue=='Away':
+            fouls = int(has_fouls.find_next('div').text) if has_fouls else None
+            corners = int(has_corners.find_next('div').text) if has_corners else None
+            offsides = int(has_offsides.find_next('div').text) if has_offsides else None
+
+        match_report['fouls'] = fouls
+        match_report['corners'] = corners
+        match_report['offsides'] = offsides
+
+
+    events_wrap = soup.find('div', attrs={'id': 'events_wrap'})
+    if events_wrap:
+        events = events_wrap.find_all('div', attrs={'class': f'event {venue_event_class}'})
+
+        for node in events:
+            event = _event(node)
+            if event:
+                match_report['summary'].append(event)
+
+    return match_report
+
+
+def _event(node) -> Event:
+    """Return the `Event` of an event node, or None for substitutions.
+
+    The node holds a minute div followed by a `player — event` div.
+    """
+    minute_div, eventtype_div = node.find_all('div', limit=2)
+    # clean simbols of text
+    text = EVENT_CLEANER.sub('', eventtype_div.text)
+    # return only relevant parts of events
+    player, event, *_ = text.split('—', 2)
+    eventtype = event.split(' ', 1)[0]
+
+    if eventtype=='Substitute':
+        return None
+
+    player = player.split(':')
+    player = player[1] if len(player)>1 else player[0]
+    minute = MINUTE_SUFFIX.sub('', EVENT_CLEANER.sub('', minute_div.text))
+
+    return Event(minute, EventType.parse(eventtype), player)
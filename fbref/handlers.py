@@ -1,25 +1,153 @@
 
-import sys
 import requests
-import re
-import time
 from urllib.parse import urljoin
-from bs4 import BeautifulSoup
+from .extract import extract_matchlog, extract_match_report, extract_match_reports
+from .cache import CachedResponse, conditional_headers, validators
+from .metrics import stage
+from .session import FetchError, compression_saved, default_session
+from .pool import HostLimiter, iter_all, process_pool
+from .scheduler import retry_after, throttled
+
+
+class FetchHandlers(object):
+    r"""``FetchHandlers`` is the single place where pages are requested from `fbref.com`.
+
+        :params max_workers: threads used to fetch many pages at once.
+        :params per_host: simultaneous requests to the same host.
+        :params cache: optional `PageCache` consulted before any request, expired pages are revalidated.
+        :params session: `Session` used for requests, a shared one by default.
+        :params parser: `BeautifulSoup` backend ('html.parser', 'lxml'), see `extract.PARSER`.
+        :params targeted: build trees only from the parts of each page that are used.
+        :params store: optional `HistoryStore`, match reports already stored are not fetched again.
+        :params metrics: optional `Metrics` recording requests, cache usage and stage timings.
+        :params scheduler: optional `CrawlScheduler` pacing every request, shared by every object created from this one.
+        :params processes: parse pages in a shared pool of that many processes instead of the calling thread.
+
+    """
+    def __init__(self, max_workers: int = 4, per_host: int = 2, cache=None, session=None, parser: str = None, targeted: bool = True, store=None, metrics=None, scheduler=None, processes: int = None) -> None:
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.cache = cache
+        self.session = session or default_session()
+        self.parser = parser
+        self.targeted = targeted
+        self.store = store
+        self.metrics = metrics
+        self.scheduler = scheduler
+        self.processes = processes
+        self._limiter = HostLimiter(per_host=per_host)
+
+    def _options(self) -> dict:
+        """Return the fetch options to hand to objects created from this one."""
+        return {
+            'max_workers': self.max_workers,
+            'per_host': self.per_host,
+            'cache': self.cache,
+            'session': self.session,
+            'parser': self.parser,
+            'targeted': self.targeted,
+            'store': self.store,
+            'metrics': self.metrics,
+            'scheduler': self.scheduler,
+            'processes': self.processes
+        }
+
+    def _sync_options(self) -> dict:
+        """Return the options understood by the sync handlers, without the ones added by subclasses (e.g. async clients)."""
+        return FetchHandlers._options(self)
+
+    def _fetch(self, url: str, kind: str = 'page'):
+        """Return the response for `url`, from `cache` when it is fresh.
+
+        An expired page is requested with `If-None-Match`/`If-Modified-Since`,
+        a 304 answer returns the cached content as a `not_modified` response.
+
+        :params kind: 'schedule', 'squad' or 'report', selects the cache TTL.
+        """
+        rsp = self._from_cache(url, kind)
+        if rsp is not None:
+            return rsp
+
+        if self.scheduler is not None:
+            with stage(self.metrics, 'wait', kind):
+                self.scheduler.acquire(kind)
+
+        try:
+            with self._limiter.hold(url), stage(self.metrics, 'fetch', kind):
+                rsp = self.session.get(url, headers=self._conditional_headers(url))
+        except requests.RequestException as error:
+            raise FetchError(f"Can't collect {url}. See error:\n {error}", url=url) from error
+
+        return self._handle_response(url, kind, rsp)
+
+    def _from_cache(self, url: str, kind: str):
+        if self.cache is None:
+            return None
+
+        content = self.cache.get(url, kind)
+        self._record_cache(url, kind, content)
+
+        return CachedResponse(url, content) if content is not None else None
+
+    def _conditional_headers(self, url: str) -> dict:
+        if self.cache is None:
+            return {}
+
+        return conditional_headers(self.cache.validators(url))
+
+    def _handle_response(self, url: str, kind: str, rsp):
+        self._record_response(url, kind, rsp)
+
+        if rsp.status_code!=304:
+            return rsp
+
+        content = self.cache.revalidate(url) if self.cache is not None else None
+        if content is None:
+            raise FetchError(f"Can't collect {url}. Error: 304 without a cached page", url=url, status_code=304)
+
+        if self.metrics is not None:
+            self.metrics.record_saved(url, kind, len(content))
+
+        return CachedResponse(url, content, not_modified=True)
+
+    def _parsed(self, rsp, key: tuple, parse):
+        """Return `parse()`, or the result kept for the page when a 304 confirmed it did not change."""
+        if self.cache is None:
+            return parse()
+
+        return self.cache.memo(rsp.url, (*key, self.parser, self.targeted), parse, reuse=getattr(rsp, 'not_modified', False))
+
+    def _extract(self, kind: str, extract, *args):
+        """Call an `extract` function on page content, in the process pool when `processes` is set.
+
+        Workers return plain records (dicts, lists and `Event` tuples), the parse
+        stage then times the whole round trip.
+        """
+        if not self.processes:
+            return extract(*args, parser=self.parser, targeted=self.targeted, metrics=self.metrics)
+
+        with stage(self.metrics, 'parse', kind):
+            return process_pool(self.processes).submit(extract, *args, self.parser, self.targeted).result()
+
+    def _record_cache(self, url: str, kind: str, content: bytes) -> None:
+        if self.metrics is not None:
+            self.metrics.record_cache(url, kind, hit=content is not None)
 
+    def _record_response(self, url: str, kind: str, rsp) -> None:
+        if self.scheduler is not None:
+            self.scheduler.feedback(429 if throttled(rsp) else rsp.status_code, retry_after(rsp))
 
-class PreviousMatchHandlers(object):
+        if self.metrics is not None:
+            self.metrics.record_request(url, kind, rsp.status_code, len(rsp.content))
 
-    def _handle_first_half(self, event: dict) -> bool:
-        if int(event['minute'][:2])<46:
-            return True
-        
-        return False
+            if compression_saved(rsp):
+                self.metrics.record_saved(url, kind, compression_saved(rsp))
 
-    def _handle_second_half(self, event: dict) -> bool:
-        if int(event['minute'][:2])>45:
-            return True
-        
-        return False
+        if self.cache is not None and rsp.status_code<400 and rsp.status_code!=304:
+            self.cache.set(url, rsp.content, kind, validators(rsp))
+
+
+class PreviousMatchHandlers(FetchHandlers):
 
     def _handle_played_matches(self, rows: list, competitions: str, venue: str) -> list:
         matches = []
@@ -29,141 +157,118 @@ class PreviousMatchHandlers(object):
         SAME_COMP_ALL_VENUE = True if competitions=='same' and venue=='all' else False
         SAME_COMP_SAME_VENUE = True if competitions=='same' and venue=='same' else False
 
-        for row in rows:
-            result = row.find('td', attrs={'data-stat': 'result'})
-            if result.text:
-                data = row.find_all('td')
-                match_dict = {stat.attrs['data-stat']: stat for stat in data}
-                
+        for match_dict in rows:
+            if match_dict.get('result'):
                 if ALL_COMP_ALL_VENUE:
                     matches.append(match_dict)
 
-                if ALL_COMP_SAME_VENUE and match_dict['venue'].text==self._venue:
+                if ALL_COMP_SAME_VENUE and match_dict['venue']==self._venue:
                         matches.append(match_dict)
 
-                if SAME_COMP_ALL_VENUE and match_dict['comp'].text==self._competition:
+                if SAME_COMP_ALL_VENUE and match_dict['comp']==self._competition:
                         matches.append(match_dict)
 
                 if SAME_COMP_SAME_VENUE:
-                    if match_dict['comp'].text==self._competition and match_dict['venue'].text==self._venue:
+                    if match_dict['comp']==self._competition and match_dict['venue']==self._venue:
                         matches.append(match_dict)
 
         return matches
 
+    def _handle_matchlog(self, squad_url: str) -> dict:
+        rsp = self._fetch(squad_url, 'squad')
+
+        return self._handle_squad_response(rsp)
+
+    def _handle_squad_response(self, rsp) -> dict:
+        if rsp.status_code>=400:
+            raise FetchError(
+                f"Can't collect {rsp.url}. Error: {rsp.status_code} - {rsp.reason}",
+                url=rsp.url,
+                status_code=rsp.status_code
+            )
+
+        return self._parsed(rsp, ('squad',), lambda: self._extract('squad', extract_matchlog, rsp.content))
+
+    def _select_previous_matches(self, matchlog: dict, previous_matches: int, competitions: str, venue: str) -> list:
+        """Apply `competitions`/`venue` filters to a matchlog and keep the last N played matches."""
+        self.position = matchlog['position']
+        matches = self._handle_played_matches(matchlog['rows'], competitions, venue)
+        matches.reverse()
+
+        return matches[:previous_matches]
+
     def _handle_previous_matches(self, squad_url, previous_matches, competitions, venue) -> list:
+        matchlog = self._handle_matchlog(squad_url)
 
-        last_matches = []
-        rsp = requests.request('GET', squad_url)
-        content = rsp.content
-        soup = BeautifulSoup(content, 'html.parser')
-        record = soup.find('strong', text='Record:')
-        matchlogs = soup.find('table', attrs={'id': 'matchlogs_for'})
+        return self._select_previous_matches(matchlog, previous_matches, competitions, venue)
 
-        if matchlogs:
-            matchlogs_table = matchlogs.find('tbody')
-            rows = matchlogs_table.find_all('tr')
+    def _report_refs(self, previous_matches: list) -> list:
+        return [(match.get('match_report'), match.get('venue')) for match in previous_matches]
 
-            try:
-                self.position = re.search(r'(\d+)[a-z]{2}',record.next_sibling)[0] if record else ''
-            except TypeError:
-                self.position = ''
-                
-            matches = self._handle_played_matches(rows, competitions, venue)
-            matches.reverse()
+    def _handle_report_response(self, rsp, venue: str) -> dict:
+        if rsp.status_code>=400:
+            raise FetchError(
+                f'Erro ao coletar estatisticas {self.name}\nErro: {rsp.status_code} - {rsp.reason}',
+                url=rsp.url,
+                status_code=rsp.status_code
+            )
 
-            for i in range(previous_matches):
-                if i<len(matches):
-                    match = matches[i] 
-                    last_matches.append(match)
+        return self._parsed(rsp, ('report', venue), lambda: self._extract('report', extract_match_report, rsp.content, venue))
 
-        return last_matches
+    def _handle_report_sides(self, rsp) -> dict:
+        """Return both sides of a match report, `{'Home': report, 'Away': report}`, parsed once."""
+        if rsp.status_code>=400:
+            raise FetchError(
+                f"Can't collect {rsp.url}. Error: {rsp.status_code} - {rsp.reason}",
+                url=rsp.url,
+                status_code=rsp.status_code
+            )
 
-    def _handle_match_report(self, match_url: str, venue: str) -> dict:
-        match_report = {
-            'shots': None,
-            'shots_on_target': None,
-            'corners': None,
-            'offsides': None,
-            'fouls': None,
-            'summary': []
-        }
-        # add waiting time to avoid block
-        time.sleep(0)
+        return self._parsed(rsp, ('reports',), lambda: self._extract('report', extract_match_reports, rsp.content))
 
+    def _handle_match_report(self, match_url: str, venue: str) -> dict:
         url = urljoin('https://fbref.com/', match_url)
-        rsp = requests.request('GET', url)
-        cleanr = re.compile('<.*?>|/|\n|\t|\xa0|—|\d+%|%|&([a-z0-9]+|#[0-9]{1,6}|#x[0-9a-f]{a,6});')
-        venue_event_class = 'a' if venue=='Home' else 'b'
-
-        if rsp.status_code<400:
-            content = rsp.content
-            soup = BeautifulSoup(content, 'html.parser')
-            team_stats = soup.find('div', attrs={'id': 'team_stats'})
-
-            # Shots on Target
-            shots_on_target = team_stats.find('tr', text='Shots on Target')
-
-            if shots_on_target:
-                i = 0 if venue=='Home' else 1
-                shot_values = shots_on_target.find_next('tr')
-                team_shot = shot_values.find_all('td')[i]
-
-                shots_text = team_shot.find('div').find('div').text
-                # clean simbols and accuracy of text
-                shots_text = re.sub(cleanr,'',shots_text)
-                match_report['shots'] = int(shots_text.split(' of ')[1])
-                match_report['shots_on_target'] = int(re.sub(cleanr,'',shots_text.split(' of ')[0]))
-
-            team_stats_extra = soup.find('div', attrs={'id': 'team_stats_extra'})
-
-            if team_stats_extra:
-                has_fouls = team_stats_extra.find('div', text='Fouls')
-                has_corners = team_stats_extra.find('div', text='Corners')
-                has_offsides = team_stats_extra.find('div', text='Offsides')
-                fouls = None
-                corners = None
-                offsides = None
-
-                if venue=='Home':
-                    fouls = int(has_fouls.find_previous('div').text) if has_fouls else None
-                    corners = int(has_corners.find_previous('div').text) if has_corners else None
-                    offsides = int(has_offsides.find_previous('div').text) if has_offsides else None
-
-                if venue=='Away':
-                    fouls = int(has_fouls.find_next('div').text) if has_fouls else None
-                    corners = int(has_corners.find_next('div').text) if has_corners else None
-                    offsides = int(has_offsides.find_next('div').text) if has_offsides else None
-                
-                match_report['fouls'] = fouls
-                match_report['corners'] = corners
-                match_report['offsides'] = offsides
-
-            
-            events_wrap = soup.find('div', attrs={'id': 'events_wrap'})
-            if events_wrap:
-                events = events_wrap.find_all('div', attrs={'class': f'event {venue_event_class}'})
-
-                for event in events:
-                    cleanr = re.compile('<.*?>|/|\n|\t|\xa0|&([a-z0-9]+|#[0-9]{1,6}|#x[0-9a-f]{a,6});')
-                    minute_div = event.find_all('div')[0]
-                    eventtype_div = event.find_all('div')[1]
-                    # clean simbols of text
-                    cleaned_minute = re.sub(cleanr, '', minute_div.text)
-                    cleaned_event = re.sub(cleanr, '', eventtype_div.text)
-                    # return only relevant parts of events
-                    minute = re.sub(r'\’.+','', cleaned_minute)
-                    event = cleaned_event.split('—')[1].split(' ')[0]
-                    player_event = cleaned_event.split('—')[0].split(':')
-                    player_event = player_event[1] if len(player_event)>1 else player_event[0]
-
-                    if event!='Substitute':
-                        match_report['summary'].append({
-                            'minute': minute,
-                            'eventtype': event,
-                            'player': player_event
-                        })
-        else:
-            print(f'Erro ao coletar estatisticas {self.name}\nErro: {rsp.status_code} - {rsp.reason}')
-            sys.exit()
-
-        return match_report
\ No newline at end of file
+        rsp = self._fetch(url, 'report')
+
+        return self._handle_report_response(rsp, venue)
+
+    def _iter_match_reports(self, reports: list):
+        """Collect many match reports concurrently, yield `(index, report)` as each one is parsed.
+
+        :params reports: list of `(match_url, venue)` tuples.
+        """
+        return iter_all(
+            lambda report: self._handle_match_report(match_url=report[0], venue=report[1]),
+            reports,
+            max_workers=self.max_workers
+        )
+
+    def _iter_stored_reports(self, squad_url: str, matchlog: dict, previous_matches: list):
+        """Yield `(index, report)` for `previous_matches`, stored reports first, then fetched ones as they are parsed.
+
+        New reports are saved to `store` once every report was collected.
+        """
+        reports = self._report_refs(previous_matches)
+
+        if self.store is None:
+            yield from self._iter_match_reports(reports)
+            return
+
+        known = self.store.load(squad_url)
+        missing = []
+
+        for index, (match_url, _) in enumerate(reports):
+            report = (known.get(match_url) or {}).get('report')
+
+            if report is None:
+                missing.append(index)
+            else:
+                yield index, report
+
+        collected = {}
+
+        for position, report in self._iter_match_reports([reports[index] for index in missing]):
+            collected[reports[missing[position]][0]] = report
+            yield missing[position], report
+
+        self.store.save(squad_url, matchlog['rows'], collected, position=matchlog['position'], name=self.name)
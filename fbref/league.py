@@ -0,0 +1,125 @@
+from urllib.parse import urljoin, urlparse
+from .extract import extract_league_schedule, extract_league_table
+from .handlers import FetchHandlers
+from .session import FetchError
+
+
+class LeagueIndex(FetchHandlers):
+    r"""``LeagueIndex`` keeps the results of every squad of a competition, from two pages.
+
+        The competition schedule page gives date, venue and goals of every fixture
+        and the league table gives the position of each squad, so a whole round can
+        be previewed without one squad page per team. Match reports are not read:
+        squads built from the index have results and goals but no report stats
+        (corners, shots, events...).
+
+        See following example:
+
+            index = LeagueIndex(9, 'Premier League')
+
+            index.build()
+
+            squad = Squad(name, 'Premier League', 'Home')
+
+            squad.index_summary(index, href, previous_matches=5, competitions='same', venue='all')
+
+    """
+    def __init__(self, competition_id, name: str, season: str = None, **options) -> None:
+        """
+        :params competition_id: fbref id of the competition, `9` in `/en/comps/9/Premier-League-Stats`.
+        :params name: competition name as shown in squad matchlogs, e.g. 'Premier League'.
+        :params season: e.g. '2022-2023', the current season by default.
+        """
+        super().__init__(**options)
+        self.competition_id = competition_id
+        self.name = name
+        self.season = season
+        self.fixtures = []
+        self.table = {}
+
+    def _url(self, page: str) -> str:
+        slug = self.name.replace(' ', '-')
+
+        if self.season:
+            path = f'/en/comps/{self.competition_id}/{self.season}/{page}{self.season}-{slug}'
+        else:
+            path = f'/en/comps/{self.competition_id}/{page}{slug}'
+
+        return urljoin('https://fbref.com', path)
+
+    @property
+    def schedule_url(self) -> str:
+        return self._url('schedule/')+'-Scores-and-Fixtures'
+
+    @property
+    def table_url(self) -> str:
+        return self._url('')+'-Stats'
+
+    def _page(self, url: str, extract):
+        rsp = self._fetch(url, 'schedule')
+
+        if rsp.status_code>=400:
+            raise FetchError(f"Can't collect {url}. Error: {rsp.status_code} - {rsp.reason}", url=url, status_code=rsp.status_code)
+
+        return self._parsed(rsp, (extract.__name__,), lambda: self._extract('schedule', extract, rsp.content))
+
+    def build(self):
+        """Fetch the schedule page and the league table, return the index."""
+        self.fixtures = self._page(self.schedule_url, extract_league_schedule)
+        self.table = {_squad_key(row['squad_ref']): row for row in self._page(self.table_url, extract_league_table)}
+
+        return self
+
+    def position(self, href: str) -> str:
+        """Return the league position of a squad, e.g. '1st', or None when it is not in the table."""
+        row = self.table.get(_squad_key(href))
+
+        return row['position'] if row else None
+
+    def matchlog(self, href: str) -> dict:
+        """Return the matches of a squad in the competition, shaped like a squad page matchlog.
+
+        Rows are in schedule order, unplayed fixtures have an empty `result`.
+        """
+        key = _squad_key(href)
+        rows = []
+
+        for fixture in self.fixtures:
+            if _squad_key(fixture['home_ref'])==key:
+                rows.append(self._row(fixture, 'Home', fixture['home_goals'], fixture['away_goals'], fixture['away']))
+            elif _squad_key(fixture['away_ref'])==key:
+                rows.append(self._row(fixture, 'Away', fixture['away_goals'], fixture['home_goals'], fixture['home']))
+
+        return {'position': self.position(href), 'rows': rows}
+
+    def _row(self, fixture: dict, venue: str, goals_for: int, goals_against: int, opponent: str) -> dict:
+        played = goals_for is not None
+
+        if not played:
+            result = ''
+        elif goals_for>goals_against:
+            result = 'W'
+        elif goals_for<goals_against:
+            result = 'L'
+        else:
+            result = 'D'
+
+        return {
+            'date': fixture['date'],
+            'time': fixture['time'],
+            'comp': self.name,
+            'venue': venue,
+            'result': result,
+            'goals_for': str(goals_for) if played else '',
+            'goals_against': str(goals_against) if played else '',
+            'opponent': opponent,
+            'match_report': fixture['match_report']
+        }
+
+
+def _squad_key(href: str) -> str:
+    # squads are matched by id, hrefs may be relative, absolute or of a given season
+    path = urlparse(href).path
+    parts = path.split('/')
+
+    return parts[3] if len(parts)>3 and parts[2]=='squads' else path
@@ -0,0 +1,136 @@
+import time
+import logging
+import threading
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+
+
+class Metrics(object):
+    r"""``Metrics`` records requests, cache usage and time spent on each stage.
+
+        Stages are `wait` (paced by a `CrawlScheduler`), `fetch`, `parse` (building
+        the tree), `extract` (reading values from it) and `aggregate` (squad
+        statistics), labelled by kind of page. Bytes saved by compression and by
+        304 answers are counted as `saved`.
+        Hooks are called with `(event, data)` for every record, see `LoggingExporter`.
+
+        See following example:
+
+            metrics = Metrics(hooks=[LoggingExporter()])
+
+            matches = ScheduledMatches(metrics=metrics)
+
+            matches.day_matches('YYYY-MM-DD')
+
+            print(metrics.to_prometheus())
+
+    """
+    def __init__(self, hooks: list = None) -> None:
+        self.hooks = list(hooks or [])
+        self.requests = Counter()
+        self.bytes = Counter()
+        self.saved = Counter()
+        self.cache_hits = Counter()
+        self.cache_misses = Counter()
+        self.stages = defaultdict(lambda: {'calls': 0, 'seconds': 0.0, 'max': 0.0})
+        self._lock = threading.Lock()
+
+    def _emit(self, event: str, data: dict) -> None:
+        for hook in self.hooks:
+            hook(event, data)
+
+    def record_request(self, url: str, kind: str, status_code: int, size: int) -> None:
+        with self._lock:
+            self.requests[(kind, status_code)] += 1
+            self.bytes[kind] += size
+
+        self._emit('request', {'url': url, 'kind': kind, 'status_code': status_code, 'bytes': size})
+
+    def record_saved(self, url: str, kind: str, size: int) -> None:
+        """Record bytes not transferred, thanks to compression or a 304 answer."""
+        with self._lock:
+            self.saved[kind] += size
+
+        self._emit('saved', {'url': url, 'kind': kind, 'bytes': size})
+
+    def record_cache(self, url: str, kind: str, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.cache_hits[kind] += 1
+            else:
+                self.cache_misses[kind] += 1
+
+        self._emit('cache', {'url': url, 'kind': kind, 'hit': hit})
+
+    def record_stage(self, name: str, kind: str, seconds: float) -> None:
+        with self._lock:
+            stage = self.stages[(name, kind)]
+            stage['calls'] += 1
+            stage['seconds'] += seconds
+            stage['max'] = max(stage['max'], seconds)
+
+        self._emit('stage', {'stage': name, 'kind': kind, 'seconds': seconds})
+
+    @contextmanager
+    def stage(self, name: str, kind: str = 'page'):
+        """Time the block as stage `name` of a `kind` of page."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(name, kind, time.perf_counter()-start)
+
+    def snapshot(self) -> dict:
+        """Return a plain copy of every counter."""
+        with self._lock:
+            return {
+                'requests': {f'{kind}:{status_code}': count for (kind, status_code), count in self.requests.items()},
+                'bytes': dict(self.bytes),
+                'saved': dict(self.saved),
+                'cache_hits': dict(self.cache_hits),
+                'cache_misses': dict(self.cache_misses),
+                'stages': {f'{name}:{kind}': dict(stage) for (name, kind), stage in self.stages.items()}
+            }
+
+    def to_prometheus(self, prefix: str = 'fbref') -> str:
+        """Return every counter in the Prometheus text exposition format."""
+        lines = []
+
+        def metric(name: str, kind: str, samples: list) -> None:
+            lines.append(f'# TYPE {prefix}_{name} {kind}')
+            for labels, value in samples:
+                labels = ','.join(f'{key}="{label}"' for key, label in labels.items())
+                lines.append(f'{prefix}_{name}{{{labels}}} {value}')
+
+        with self._lock:
+            metric('requests_total', 'counter', [
+                ({'kind': kind, 'status': status_code}, count) for (kind, status_code), count in sorted(self.requests.items())
+            ])
+            metric('response_bytes_total', 'counter', [({'kind': kind}, size) for kind, size in sorted(self.bytes.items())])
+            metric('saved_bytes_total', 'counter', [({'kind': kind}, size) for kind, size in sorted(self.saved.items())])
+            metric('cache_hits_total', 'counter', [({'kind': kind}, count) for kind, count in sorted(self.cache_hits.items())])
+            metric('cache_misses_total', 'counter', [({'kind': kind}, count) for kind, count in sorted(self.cache_misses.items())])
+            stages = sorted(self.stages.items())
+            metric('stage_calls_total', 'counter', [({'stage': name, 'kind': kind}, stage['calls']) for (name, kind), stage in stages])
+            metric('stage_seconds_total', 'counter', [({'stage': name, 'kind': kind}, round(stage['seconds'], 6)) for (name, kind), stage in stages])
+            metric('stage_seconds_max', 'gauge', [({'stage': name, 'kind': kind}, round(stage['max'], 6)) for (name, kind), stage in stages])
+
+        return '\n'.join(lines)+'\n'
+
+
+class LoggingExporter(object):
+    r"""``LoggingExporter`` is a `Metrics` hook writing every record to a logger."""
+    def __init__(self, logger: logging.Logger = None, level: int = logging.DEBUG) -> None:
+        self.logger = logger or logging.getLogger('fbref')
+        self.level = level
+
+    def __call__(self, event: str, data: dict) -> None:
+        self.logger.log(self.level, 'fbref %s %s', event, ' '.join(f'{key}={value}' for key, value in data.items()))
+
+
+def stage(metrics: Metrics, name: str, kind: str = 'page'):
+    """Return `metrics.stage(name, kind)`, or a no-op context when there are no metrics."""
+    if metrics is None:
+        return nullcontext()
+
+    return metrics.stage(name, kind)
@@ -0,0 +1,98 @@
+import re
+import sys
+from enum import Enum
+from typing import NamedTuple, Optional, Union
+from dataclasses import dataclass, fields
+
+# country code before a squad name, e.g. 'eng Arsenal'
+COUNTRY_PREFIX = re.compile(r'^[a-z]+\s')
+
+
+class EventType(str, Enum):
+    r"""``EventType`` of a match report event, compares equal to its text (e.g. `'Goal'`)."""
+    GOAL = 'Goal'
+    OWN_GOAL = 'Own'
+    PENALTY = 'Penalty'
+    YELLOW = 'Yellow'
+    SECOND_YELLOW = 'Second'
+    RED = 'Red'
+    SUBSTITUTE = 'Substitute'
+
+    def __str__(self) -> str:
+        return self.value
+
+    @classmethod
+    def parse(cls, text: str) -> Union['EventType', str]:
+        """Return the member for `text`, or the text itself when it is not known."""
+        try:
+            return cls(text)
+        except ValueError:
+            return sys.intern(text)
+
+
+class Event(NamedTuple):
+    r"""``Event`` of one side of a match report."""
+    minute: str
+    eventtype: Union[EventType, str]
+    player: str
+
+    def to_dict(self) -> dict:
+        return {'minute': self.minute, 'eventtype': str(self.eventtype), 'player': self.player}
+
+    @classmethod
+    def from_dict(cls, event: dict) -> 'Event':
+        return cls(event['minute'], EventType.parse(event['eventtype']), event['player'])
+
+
+@dataclass(frozen=True, slots=True)
+class PreviousMatch:
+    r"""``PreviousMatch`` played by a squad, with the stats of its match report."""
+    time: Optional[str] = None
+    competition: Optional[str] = None
+    result: Optional[str] = None
+    venue: Optional[str] = None
+    opponent: Optional[str] = None
+    goals_for: Optional[int] = None
+    goals_against: Optional[int] = None
+    formation: Optional[str] = None
+    possession: Optional[float] = None
+    captain: Optional[str] = None
+    corners: Optional[int] = None
+    shots: Optional[int] = None
+    shots_on_target: Optional[int] = None
+    offsides: Optional[int] = None
+    fouls: Optional[int] = None
+    match_summary: tuple = ()
+
+    @classmethod
+    def from_row(cls, match: dict, match_report: dict) -> 'PreviousMatch':
+        """Return the match of a matchlog row with the stats of its report.
+
+        :params match: matchlog row, see `extract.extract_matchlog`.
+        :params match_report: squad side of the report, see `extract.extract_match_report`.
+        """
+        return cls(
+            time=match.get('time'),
+            competition=match.get('comp'),
+            result=match.get('result'),
+            venue=match.get('venue'),
+            # parse name when country comes first or at the end
+            opponent=COUNTRY_PREFIX.sub('', match.get('opponent')),
+            goals_for=int(match.get('goals_for').split(' ')[0]),
+            goals_against=int(match.get('goals_against').split(' ')[0]),
+            formation=match.get('formation'),
+            possession=float(match.get('possession')) if match.get('possession') else None,
+            captain=match.get('captain'),
+            corners=match_report['corners'],
+            shots=match_report['shots'],
+            shots_on_target=match_report['shots_on_target'] or 0,
+            offsides=match_report['offsides'],
+            fouls=match_report['fouls'],
+            match_summary=tuple(match_report['summary'])
+        )
+
+    def to_dict(self) -> dict:
+        previous_match = {field.name: getattr(self, field.name) for field in fields(self)}
+        previous_match['match_summary'] = [event.to_dict() for event in self.match_summary]
+
+        return previous_match
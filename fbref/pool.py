@@ -0,0 +1,104 @@
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+
+
+class HostLimiter(object):
+    r"""``HostLimiter`` bounds how many requests run at once against the same host.
+
+        See following example:
+
+            limiter = HostLimiter(per_host=2)
+
+            with limiter.hold('https://fbref.com/en/matches/...'):
+                ...
+
+    """
+    def __init__(self, per_host: int = 2) -> None:
+        self.per_host = per_host
+        self._lock = threading.Lock()
+        self._semaphores = {}
+
+    def _semaphore(self, url: str) -> threading.BoundedSemaphore:
+        host = urlparse(url).netloc
+
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.per_host)
+
+            return self._semaphores[host]
+
+    def hold(self, url: str) -> threading.BoundedSemaphore:
+        return self._semaphore(url)
+
+
+_process_pools = {}
+_process_lock = threading.Lock()
+
+
+def process_pool(processes: int) -> ProcessPoolExecutor:
+    """Return the pool of `processes` workers shared by every object asking for that size.
+
+    Workers are started from a fresh interpreter (`forkserver`, `spawn` where it is missing),
+    forking a process running fetch threads may copy locks held by them.
+    """
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+    with _process_lock:
+        if processes not in _process_pools:
+            _process_pools[processes] = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context(method))
+
+        return _process_pools[processes]
+
+
+def fetch_all(func, items: list, max_workers: int = 4) -> list:
+    """Call `func` for every item using a thread pool and return results in `items` order.
+
+    :params func: callable receiving one item.
+    :params items: list of arguments, one per call.
+    :params max_workers: number of threads, `1` runs everything serially.
+    """
+    if max_workers<=1 or len(items)<=1:
+        return [func(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        return list(executor.map(func, items))
+
+
+def iter_all(func, items: list, max_workers: int = 4):
+    """Call `func` for every item using a thread pool and yield `(index, result)` as each call finishes.
+
+    Calls not started yet are cancelled when the generator is closed early.
+
+    :params func: callable receiving one item.
+    :params items: list of arguments, one per call.
+    :params max_workers: number of threads, `1` runs everything serially.
+    """
+    if max_workers<=1 or len(items)<=1:
+        for index, item in enumerate(items):
+            yield index, func(item)
+        return
+
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(items)))
+
+    try:
+        futures = {executor.submit(func, item): index for index, item in enumerate(items)}
+
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def in_order(results):
+    """Yield `(index, result)` pairs by index, each one as soon as every previous index arrived."""
+    pending = {}
+    position = 0
+
+    for index, result in results:
+        pending[index] = result
+
+        while position in pending:
+            yield position, pending.pop(position)
+            position += 1
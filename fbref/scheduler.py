@@ -0,0 +1,117 @@
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+
+# lower is fetched first, match reports wait for every page they depend on
+PRIORITY = {'schedule': 0, 'squad': 1, 'page': 2, 'report': 3}
+
+
+class CrawlScheduler(object):
+    r"""``CrawlScheduler`` paces every request to `fbref.com` with a token bucket.
+
+        Requests take one token each, tokens refill at `rpm` per minute up to `burst`.
+        Waiting requests are served by priority (schedule, then squad pages, then
+        match reports) and in arrival order within a priority. A 429 answer halves
+        the rate and pauses for its `Retry-After`, successful answers bring the
+        rate back to `rpm` step by step.
+
+        See following example:
+
+            scheduler = CrawlScheduler(rpm=20)
+
+            matches = ScheduledMatches(scheduler=scheduler)
+
+            matches.day_matches('YYYY-MM-DD')
+
+    """
+    def __init__(self, rpm: float = 20, burst: int = 1, min_rpm: float = 2, recovery: int = 20) -> None:
+        """
+        :params rpm: requests per minute budget.
+        :params burst: requests allowed back to back after an idle period.
+        :params min_rpm: lowest rate reached after repeated 429 answers.
+        :params recovery: successful answers needed to go from `min_rpm` back to `rpm`.
+        """
+        self.rpm = rpm
+        self.burst = burst
+        self.min_rpm = min_rpm
+        self.recovery = recovery
+        self.rate = rpm
+        self.throttled = 0
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._queue = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens+(now-self._updated)*self.rate/60)
+        self._updated = now
+
+    def _delay(self, now: float) -> float:
+        if now<self._paused_until:
+            return self._paused_until-now
+
+        return max(0.0, (1-self._tokens)*60/self.rate)
+
+    def acquire(self, kind: str = 'page') -> float:
+        """Block until a request of `kind` may be sent, return the seconds waited."""
+        start = time.monotonic()
+        entry = (PRIORITY.get(kind, PRIORITY['page']), next(self._counter))
+
+        with self._condition:
+            heapq.heappush(self._queue, entry)
+
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                delay = self._delay(now)
+
+                if self._queue[0]==entry and delay<=0:
+                    heapq.heappop(self._queue)
+                    self._tokens -= 1
+                    self._condition.notify_all()
+
+                    return now-start
+
+                # the head of the queue sleeps until the next token, the others until notified
+                self._condition.wait(delay if self._queue[0]==entry else None)
+
+    async def aacquire(self, kind: str = 'page') -> float:
+        """Wait without blocking the event loop until a request of `kind` may be sent."""
+        return await asyncio.to_thread(self.acquire, kind)
+
+    def feedback(self, status_code: int, retry_after: float = None) -> None:
+        """Adapt the rate to an answer, `status_code` 429 slows every following request."""
+        with self._condition:
+            if status_code==429:
+                self.throttled += 1
+                self.rate = max(self.min_rpm, self.rate/2)
+                self._tokens = min(self._tokens, 0.0)
+
+                if retry_after:
+                    self._paused_until = max(self._paused_until, time.monotonic()+retry_after)
+            elif status_code<400:
+                self.rate = min(self.rpm, self.rate+(self.rpm-self.min_rpm)/self.recovery)
+
+            self._condition.notify_all()
+
+
+def retry_after(rsp) -> float:
+    """Return the `Retry-After` of a response in seconds, when it is given in seconds."""
+    try:
+        return float(rsp.headers.get('Retry-After'))
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def throttled(rsp) -> bool:
+    """Return True when the response, or a retry made by the `Session` before it, was a 429."""
+    if rsp.status_code==429:
+        return True
+
+    retries = getattr(getattr(rsp, 'raw', None), 'retries', None)
+
+    return any(attempt.status==429 for attempt in getattr(retries, 'history', ()))
@@ -0,0 +1,227 @@
+import json
+import time
+import logging
+import threading
+from urllib.parse import urlparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from .batch import DayBatch
+from .cache import PageCache
+
+# rendered forms of a preview, `json` holds both squads with their history
+VIEWS = ('describe', 'describe2', 'json')
+
+logger = logging.getLogger('fbref')
+
+
+def fixture_id(match) -> str:
+    """Return the id of a fixture from its squad ids and date, e.g. '18bb7c10-cff3d9bb-2022-09-24'."""
+    squads = [urlparse(href).path.split('/')[3] for href in (match._home_ref, match._away_ref)]
+
+    return '-'.join([*squads, str(match.date)])
+
+
+class PreviewService(object):
+    r"""``PreviewService`` keeps the previews of a day of fixtures in memory.
+
+        Fixtures are collected once with a `DayBatch` and every preview is rendered
+        up front, so lookups by fixture id only read a dict. Previews expire after
+        `ttl` seconds and are rebuilt in the background, the previous ones being
+        served until the new ones replace them all at once. The service owns a
+        `PageCache` kept across refreshes, unless one is passed (`cache=None` turns
+        it off): match reports are not downloaded again and squad pages and the
+        schedule are revalidated once expired.
+
+        See following example:
+
+            service = PreviewService(previous_matches=7, cache=PageCache(directory='~/.cache/fbref'))
+
+            service.start()
+
+            service.get('18bb7c10-cff3d9bb-2022-09-24', 'describe')
+
+    """
+    def __init__(self, previous_matches: int = 7, date=None, competitions: list = None, ttl: float = 15*60, **options) -> None:
+        """
+        :params previous_matches: number of matches to considerate on summary.
+        :params date: 'YYYY-MM-DD', today (at each refresh) by default.
+        :params competitions: names or fbref ids of the competitions to keep, every one by default.
+        :params ttl: seconds before previews are refreshed.
+        :params options: fetch options, see `FetchHandlers`, a memory `PageCache` by default.
+        """
+        options.setdefault('cache', PageCache())
+        self.previous_matches = previous_matches
+        self.date = date
+        self.competitions = competitions
+        self.ttl = ttl
+        self.options = options
+        self.loaded_at = None
+        self.refreshes = 0
+        self.errors = 0
+        # fixtures left out by the last load, see `DayBatch.failures`
+        self.failed = 0
+        self._previews = {}
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def expired(self) -> bool:
+        return self.loaded_at is None or time.time()-self.loaded_at>=self.ttl
+
+    def load(self) -> None:
+        """Collect the fixtures of the day and render every preview, replacing the previous ones."""
+        batch = DayBatch(self.previous_matches, **self.options)
+        matches = batch.run(self.date, self.competitions)
+        previews = {fixture_id(match): self._render(match) for match in matches}
+
+        with self._lock:
+            self._previews = previews
+            self.failed = len(batch.failures)
+            self.loaded_at = time.time()
+            self.refreshes += 1
+
+    def _render(self, match) -> dict:
+        home = match.home_stats(previous_matches=self.previous_matches, competitions='all', venue='all')
+        away = match.away_stats(previous_matches=self.previous_matches, competitions='all', venue='all')
+        fixture = {
+            'id': fixture_id(match),
+            'date': str(match.date),
+            'competition': match.competition,
+            'time': match.time,
+            'home': match.home,
+            'away': match.away,
+            'venue': match.venue
+        }
+
+        return {
+            'fixture': fixture,
+            'describe': match.describe(self.previous_matches),
+            'describe2': match.describe2(self.previous_matches),
+            'json': json.dumps({'fixture': fixture, 'home': _squad_dict(home), 'away': _squad_dict(away)})
+        }
+
+    def refresh(self) -> bool:
+        """Load the previews again unless a refresh is running, keep the current ones on errors."""
+        if not self._refreshing.acquire(blocking=False):
+            return False
+
+        return self._refresh()
+
+    def _refresh(self) -> bool:
+        # runs with `_refreshing` held and releases it
+        try:
+            self.load()
+            return True
+        except Exception:
+            self.errors += 1
+            logger.exception('fbref preview refresh failed')
+            return False
+        finally:
+            self._refreshing.release()
+
+    def fixtures(self) -> list:
+        """Return id, teams, competition and kickoff of every fixture."""
+        with self._lock:
+            return [preview['fixture'] for preview in self._previews.values()]
+
+    def get(self, fixture_id: str, view: str = 'describe') -> str:
+        """Return a rendered preview, `None` for an unknown fixture.
+
+        Expired previews are still answered while a refresh runs in the background.
+
+        :params view: one of `VIEWS`.
+        """
+        if view not in VIEWS:
+            raise ValueError("view: status must be one of %r." % (VIEWS,))
+
+        # the lookup taking the refresh lock starts the only refresh thread, the others just read
+        if self.expired and self.loaded_at is not None and self._refreshing.acquire(blocking=False):
+            threading.Thread(target=self._refresh, daemon=True).start()
+
+        with self._lock:
+            preview = self._previews.get(fixture_id)
+
+        return preview[view] if preview else None
+
+    def start(self) -> None:
+        """Load the previews, then refresh them every `ttl` seconds in a background thread."""
+        self.load()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.ttl):
+            self.refresh()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def _squad_dict(squad) -> dict:
+    return {'name': squad.name, 'position': squad.position, 'stats': squad.stats(), 'history': squad.to_dict()}
+
+
+class PreviewHandler(BaseHTTPRequestHandler):
+    r"""``PreviewHandler`` answers lookups from the `PreviewService` of its server.
+
+        `GET /fixtures` lists the fixtures, `GET /fixtures/<id>/<view>` returns one
+        of `VIEWS` and `GET /health` the state of the service.
+
+    """
+    def do_GET(self) -> None:
+        service = self.server.service
+        parts = [part for part in urlparse(self.path).path.split('/') if part]
+
+        if parts==['fixtures']:
+            return self._send(200, json.dumps(service.fixtures()), 'application/json')
+
+        if parts==['health']:
+            health = {'loaded_at': service.loaded_at, 'expired': service.expired, 'refreshes': service.refreshes, 'errors': service.errors, 'failed': service.failed}
+            return self._send(200, json.dumps(health), 'application/json')
+
+        if len(parts)==3 and parts[0]=='fixtures' and parts[2] in VIEWS:
+            preview = service.get(parts[1], parts[2])
+
+            if preview is not None:
+                return self._send(200, preview, 'application/json' if parts[2]=='json' else 'text/plain')
+
+        self._send(404, json.dumps({'error': f'{self.path} not found'}), 'application/json')
+
+    def _send(self, status_code: int, body: str, content_type: str) -> None:
+        body = body.encode('utf-8')
+        self.send_response(status_code)
+        self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug('fbref preview %s', format % args)
+
+
+def make_server(service: PreviewService, host: str = '127.0.0.1', port: int = 8000) -> ThreadingHTTPServer:
+    """Return an HTTP server answering lookups from `service`, `port=0` picks a free port."""
+    server = ThreadingHTTPServer((host, port), PreviewHandler)
+    server.service = service
+
+    return server
+
+
+def serve(service: PreviewService, host: str = '127.0.0.1', port: int = 8000) -> None:
+    """Start `service` and answer lookups until interrupted."""
+    service.start()
+    server = make_server(service, host, port)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
@@ -0,0 +1,87 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.util.request import ACCEPT_ENCODING
+
+
+class FetchError(Exception):
+    r"""``FetchError`` is raised when a page can't be collected from `fbref.com`."""
+    def __init__(self, message: str, url: str = None, status_code: int = None) -> None:
+        super().__init__(message)
+        self.url = url
+        self.status_code = status_code
+
+
+class Session(requests.Session):
+    r"""``Session`` keeps connections to `fbref.com` alive and retries failed requests.
+
+        Requests answered with 429 or 5xx are retried with exponential backoff,
+        honouring the `Retry-After` header. Pages are asked compressed, with gzip
+        or brotli when `brotli` is installed. One session can be shared by every
+        `ScheduledMatches`, `ScheduledMatch` and `Squad`.
+
+        See following example:
+
+            session = Session(pool_size=8, retries=5)
+
+            matches = ScheduledMatches(session=session)
+
+            matches.day_matches('YYYY-MM-DD')
+
+    """
+    RETRY_STATUS = (429, 500, 502, 503, 504)
+
+    def __init__(self, pool_size: int = 10, retries: int = 3, backoff_factor: float = 1.0, timeout: float = 30) -> None:
+        """
+        :params pool_size: connections kept alive per host.
+        :params retries: attempts after the first request.
+        :params backoff_factor: seconds multiplied by 2**attempt between retries.
+        :params timeout: seconds to wait for the server.
+        """
+        super().__init__()
+        self.timeout = timeout
+        # every encoding urllib3 can decode here, 'br' needs brotli
+        self.headers['Accept-Encoding'] = ACCEPT_ENCODING
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=self.RETRY_STATUS,
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+
+        return super().request(method, url, **kwargs)
+
+
+def compression_saved(rsp) -> int:
+    """Return the bytes a compressed response saved on the wire, 0 when it was not compressed."""
+    headers = getattr(rsp, 'headers', None) or {}
+    length = headers.get('Content-Length')
+
+    if not headers.get('Content-Encoding') or headers['Content-Encoding']=='identity' or not str(length).isdigit():
+        return 0
+
+    return max(0, len(rsp.content)-int(length))
+
+
+_default_session = None
+_default_lock = threading.Lock()
+
+
+def default_session() -> Session:
+    """Return the session shared by objects created without one."""
+    global _default_session
+
+    with _default_lock:
+        if _default_session is None:
+            _default_session = Session()
+
+        return _default_session
@@ -0,0 +1,146 @@
+from collections import Counter
+from .models import EventType
+
+TOTALS = ('corners', 'fouls', 'offsides', 'shots', 'shots_on_target', 'goals_for', 'goals_against')
+
+
+def _per_game(number, matches: int) -> float:
+    return round(number/matches, 2)
+
+
+def _first_half(event) -> bool:
+    return int(event.minute[:2])<46
+
+
+def _second_half(event) -> bool:
+    return int(event.minute[:2])>45
+
+
+def _most_common(counter: Counter) -> str:
+    if len(counter)>0 and counter.most_common(1)[0][1]>1:
+        return f'{counter.most_common(1)[0][0]} [{counter.most_common(1)[0][1]}]'
+
+    return ''
+
+
+def _shots_to_goal(shots_on_target, goals) -> float:
+    try:
+        return round(shots_on_target/goals, 2)
+    except ZeroDivisionError:
+        return 0.0
+
+
+def _match_totals(history: list) -> dict:
+    matches = len(history)
+    totals = dict.fromkeys(TOTALS, 0)
+    results = {'W': 0, 'L': 0, 'D': 0, 'pts_pct': 0}
+    pts = 0
+    goals = 0
+    shots_on_target = 0
+    clean_sheets = 0
+
+    for match in history:
+        for stat in TOTALS:
+            value = getattr(match, stat)
+            if value:
+                totals[stat] += value
+
+        if match.result=='W':
+            results['W'] += 1
+            pts += 3
+
+        if match.result=='L':
+            results['L'] += 1
+
+        if match.result=='D':
+            results['D'] += 1
+            pts += 1
+
+        goals += match.goals_for
+        shots_on_target += match.shots_on_target
+
+        if match.goals_against==0:
+            clean_sheets += 1
+
+    summary = {stat: {'total': totals[stat], 'avg': 0.0} for stat in TOTALS}
+    summary['matches'] = matches
+    summary['results'] = results
+    summary['clean_sheets'] = clean_sheets
+    summary['shots_to_goal'] = _shots_to_goal(shots_on_target, goals)
+
+    if matches>0:
+        results['pts_pct'] = round((pts/(matches*3))*100, 0)
+
+        for stat in TOTALS:
+            summary[stat]['avg'] = _per_game(totals[stat], matches)
+
+    return summary
+
+
+def _columnar_totals(squad) -> dict:
+    from .columnar import HistoryFrame
+
+    summary = HistoryFrame.from_history(squad).summary()[0]
+    summary['shots_to_goal'] = _shots_to_goal(summary['shots_on_target']['total'], summary['goals_for']['total'])
+
+    return summary
+
+
+def _event_totals(history: list) -> dict:
+    matches = len(history)
+    yellow_cards = 0
+    cards_half = {'first': 0, 'second': 0}
+    goals_half = {'first': 0, 'second': 0}
+    card_players = Counter()
+    strikers = Counter()
+
+    for match in history:
+        for event in match.match_summary:
+            eventtype = event.eventtype
+
+            if eventtype==EventType.YELLOW:
+                yellow_cards += 1
+                card_players[event.player] += 1
+
+            if eventtype==EventType.GOAL:
+                strikers[event.player] += 1
+                half = goals_half
+            elif eventtype in (EventType.YELLOW, EventType.RED):
+                half = cards_half
+            else:
+                continue
+
+            if _first_half(event):
+                half['first'] += 1
+
+            if _second_half(event):
+                half['second'] += 1
+
+    summary = {
+        'cards': 0,
+        'cards_half': cards_half,
+        'goals_half': goals_half,
+        'possible_card': _most_common(card_players),
+        'possible_striker': _most_common(strikers)
+    }
+
+    if matches>0:
+        summary['cards'] = _per_game(yellow_cards, matches)
+
+        for half in (cards_half, goals_half):
+            half['first'] = _per_game(half['first'], matches)
+            half['second'] = _per_game(half['second'], matches)
+
+    return summary
+
+
+def aggregate(squad, columnar: bool = False) -> dict:
+    """Return every `Squad` statistic computed in a single sweep over its history.
+
+    :params squad: `Squad` with its history collected.
+    :params columnar: compute totals and results with `HistoryFrame` reductions (requires numpy).
+    """
+    summary = _columnar_totals(squad) if columnar else _match_totals(squad.history)
+    summary.update(_event_totals(squad.history))
+
+    return summary
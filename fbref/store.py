@@ -0,0 +1,78 @@
+import os
+import json
+import hashlib
+import threading
+from .models import Event
+
+
+class HistoryStore(object):
+    r"""``HistoryStore`` remembers the matches already collected for each squad.
+
+        One json file per squad keeps its matchlog rows and the parsed match reports,
+        keyed by match report url. A refresh downloads the squad page only and fetches
+        the reports of matches that are new or were not played at the last run.
+
+        See following example:
+
+            store = HistoryStore(directory='~/.cache/fbref/history')
+
+            squad = Squad(name, competition, venue, store=store)
+
+            squad.match_summary(href, previous_matches=10, competitions='all', venue='all')
+
+    """
+    def __init__(self, directory: str) -> None:
+        self.directory = os.path.expanduser(directory)
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, squad_url: str) -> str:
+        return os.path.join(self.directory, f"{hashlib.sha1(squad_url.encode('utf-8')).hexdigest()}.json")
+
+    def load(self, squad_url: str) -> dict:
+        """Return `{match_url: {'row': dict, 'report': dict or None}}` known for the squad."""
+        try:
+            with open(self._path(squad_url)) as history:
+                matches = json.load(history)['matches']
+        except (OSError, ValueError, KeyError):
+            return {}
+
+        for match in matches.values():
+            if match['report'] is not None:
+                match['report']['summary'] = [Event.from_dict(event) for event in match['report']['summary']]
+
+        return matches
+
+    def save(self, squad_url: str, rows: list, reports: dict, position: str = None, name: str = None) -> None:
+        """Store the matchlog rows of a squad with the reports collected so far.
+
+        :params rows: matchlog rows, played or not.
+        :params reports: `{match_url: report}` of newly collected reports.
+        :params position: league position of the squad.
+        :params name: squad name as shown in the schedule, e.g. 'Manchester Utd'.
+        """
+        with self._lock:
+            matches = self.load(squad_url)
+
+            for row in rows:
+                match_url = row.get('match_report')
+                if not match_url:
+                    continue
+
+                report = reports.get(match_url) or (matches.get(match_url) or {}).get('report')
+                matches[match_url] = {'row': row, 'report': report}
+
+            for match in matches.values():
+                if match['report'] is not None:
+                    match['report'] = {
+                        **match['report'],
+                        'summary': [Event.to_dict(event) for event in match['report']['summary']]
+                    }
+
+            path = self._path(squad_url)
+            tmp_path = f'{path}.{threading.get_ident()}.tmp'
+
+            with open(tmp_path, 'w') as history:
+                json.dump({'url': squad_url, 'name': name, 'position': position, 'matches': matches}, history)
+
+            os.replace(tmp_path, path)
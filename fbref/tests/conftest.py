@@ -0,0 +1,94 @@
+import os
+import hashlib
+import threading
+from collections import Counter
+from urllib.parse import urlparse
+import pytest
+from requests.adapters import BaseAdapter
+from requests.models import Response
+from fbref.session import Session
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+DATE = '2022-09-24'
+
+
+class FixtureAdapter(BaseAdapter):
+    r"""``FixtureAdapter`` is a local stand-in for `fbref.com`.
+
+        Pages are read from `fixtures/<url path>.html`: a day schedule, squad pages
+        and match reports with the markup of `fbref.com`. Unknown pages answer 404.
+        Pages carry an `ETag` and answer 304 to a matching `If-None-Match`.
+        Every request is counted in `calls` by url path.
+
+    """
+    def __init__(self, root: str = FIXTURES) -> None:
+        super().__init__()
+        self.root = root
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    def send(self, request, **kwargs) -> Response:
+        path = urlparse(request.url).path
+
+        with self._lock:
+            self.calls[path] += 1
+
+        rsp = Response()
+        rsp.url = request.url
+        rsp.request = request
+        rsp.headers['Content-Type'] = 'text/html; charset=utf-8'
+        page = os.path.join(self.root, f'{path.lstrip("/")}.html')
+
+        if os.path.isfile(page):
+            with open(page, 'rb') as content:
+                rsp._content = content.read()
+
+            rsp.headers['ETag'] = f'"{hashlib.sha1(rsp._content).hexdigest()}"'
+
+            if request.headers.get('If-None-Match')==rsp.headers['ETag']:
+                rsp.status_code = 304
+                rsp.reason = 'Not Modified'
+                rsp._content = b''
+            else:
+                rsp.status_code = 200
+                rsp.reason = 'OK'
+        else:
+            rsp.status_code = 404
+            rsp.reason = 'Not Found'
+            rsp._content = b'<html><body>Page Not Found</body></html>'
+
+        return rsp
+
+    def close(self) -> None:
+        pass
+
+
+def read_fixture(path: str) -> bytes:
+    with open(os.path.join(FIXTURES, f'{path.lstrip("/")}.html'), 'rb') as content:
+        return content.read()
+
+
+@pytest.fixture
+def fbref_adapter() -> FixtureAdapter:
+    return FixtureAdapter()
+
+
+@pytest.fixture
+def fbref_session(fbref_adapter) -> Session:
+    """`Session` answering every `fbref.com` request from the fixtures."""
+    session = Session(retries=0)
+    session.mount('https://fbref.com/', fbref_adapter)
+
+    return session
+
+
+def pytest_collection_modifyitems(config, items) -> None:
+    # benchmarks run only when asked for, a plain `pytest` runs the unit tests
+    if config.getoption('benchmark_only', default=False) or config.getoption('benchmark_enable', default=False):
+        return
+
+    skip = pytest.mark.skip(reason='benchmark, run with --benchmark-only')
+
+    for item in items:
+        if 'benchmark' in getattr(item, 'fixturenames', ()):
+            item.add_marker(skip)
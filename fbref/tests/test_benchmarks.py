@@ -0,0 +1,89 @@
+"""Benchmarks of the scraping pipeline over the offline fixtures.
+
+Run with `pytest fbref/tests/test_benchmarks.py --benchmark-only`, requires `pytest-benchmark`.
+Peak memory of each benchmarked call is reported in `extra_info`.
+"""
+import tracemalloc
+import pytest
+from fbref import FbrefDayMatches
+from fbref.element import Squad
+from fbref.extract import extract_match_report, extract_matchlog
+from .conftest import DATE, read_fixture
+
+pytest.importorskip('pytest_benchmark')
+
+SQUAD = '/en/squads/18bb7c10/Arsenal-Stats'
+MATCH_REPORT = '/en/matches/d50d63ec/Arsenal-Liverpool-2022-08-20-Premier-League'
+
+
+def peak_memory(func, *args, **kwargs) -> int:
+    tracemalloc.start()
+    try:
+        func(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(benchmark, func, *args, **kwargs):
+    benchmark.extra_info['peak_memory'] = peak_memory(func, *args, **kwargs)
+
+    return benchmark(func, *args, **kwargs)
+
+
+@pytest.mark.parametrize('parser', ['html.parser', 'lxml'])
+@pytest.mark.parametrize('targeted', [True, False])
+def test_parse_match_report(benchmark, parser, targeted):
+    if parser=='lxml':
+        pytest.importorskip('lxml')
+    content = read_fixture(MATCH_REPORT)
+
+    report = run(benchmark, extract_match_report, content, 'Home', parser=parser, targeted=targeted)
+
+    assert report['shots'] == 17
+
+
+@pytest.mark.parametrize('parser', ['html.parser', 'lxml'])
+def test_parse_squad_page(benchmark, parser):
+    if parser=='lxml':
+        pytest.importorskip('lxml')
+    content = read_fixture(SQUAD)
+
+    matchlog = run(benchmark, extract_matchlog, content, parser=parser)
+
+    assert matchlog['position'] == '1st'
+
+
+def test_parse_day_matches(benchmark, fbref_session):
+    matches = run(benchmark, FbrefDayMatches(session=fbref_session).day_matches, DATE)
+
+    assert len(matches) == 3
+
+
+def test_aggregate(benchmark, fbref_session):
+    squad = Squad(name='Arsenal', competition='Premier League', venue='Home', session=fbref_session)
+    squad.match_summary(href=SQUAD, previous_matches=10, competitions='all', venue='all')
+
+    def aggregate():
+        squad.history = list(squad.history)
+        return squad.stats()
+
+    stats = run(benchmark, aggregate)
+
+    assert stats['matches'] == 4
+
+
+def test_describe(benchmark, fbref_session):
+    # squads are memoized by their registry, each round gets a fresh one so nothing is reused
+    def fixture():
+        return (FbrefDayMatches(session=fbref_session).day_matches(DATE)[1],), {'previous_matches': 5}
+
+    def describe(match, previous_matches):
+        return match.describe(previous_matches=previous_matches)
+
+    args, kwargs = fixture()
+    benchmark.extra_info['peak_memory'] = peak_memory(describe, *args, **kwargs)
+
+    preview = benchmark.pedantic(describe, setup=fixture, rounds=10)
+
+    assert 'Arsenal' in preview
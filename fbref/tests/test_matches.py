@@ -1 +1,770 @@
-import pytest
\ No newline at end of file
+import os
+import socket
+import sys
+import subprocess
+import csv
+import json
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import requests
+from fbref import DayBatch, FbrefDayMatches, FetchError
+from fbref.aio import AsyncScheduledMatches, AsyncSquad, ThreadClient
+from fbref.cache import CachedResponse, PageCache
+from fbref.cli import main
+from fbref.session import Session
+from fbref.element import Squad
+from fbref.export import CsvWriter, HistoryWriter, JsonlWriter, ParquetWriter
+from fbref.extract import extract_match_report, extract_matchlog
+from fbref.league import LeagueIndex
+from fbref.metrics import Metrics
+from fbref.models import Event, EventType
+from fbref.pool import fetch_all
+from fbref.scheduler import CrawlScheduler
+from fbref.service import PreviewService, make_server
+from fbref.store import HistoryStore
+from fbref.warehouse import Warehouse
+from .conftest import DATE, FIXTURES, read_fixture
+
+ARSENAL = '/en/squads/18bb7c10/Arsenal-Stats'
+
+
+def arsenal(session, **options) -> Squad:
+    squad = Squad(name='Arsenal', competition='Premier League', venue='Home', session=session, **options)
+    squad.match_summary(href=ARSENAL, previous_matches=10, competitions='all', venue='all')
+
+    return squad
+
+
+def test_day_matches(fbref_session):
+    matches = FbrefDayMatches(session=fbref_session).day_matches(DATE)
+
+    assert [(match.competition, match.home, match.away) for match in matches] == [
+        ('La Liga', 'Barcelona', 'Real Madrid'),
+        ('Premier League', 'Arsenal', 'Everton'),
+        ('Premier League', 'Everton', 'Chelsea'),
+    ]
+    assert matches[0].time == '00:00'
+    assert matches[1].venue == 'Anfield'
+    assert matches[1]._home_ref == ARSENAL
+
+
+def test_day_matches_error(fbref_session):
+    with pytest.raises(AttributeError):
+        FbrefDayMatches(session=fbref_session).day_matches('1900-01-01')
+
+
+def test_squad_history(fbref_session, fbref_adapter):
+    squad = arsenal(fbref_session)
+
+    assert squad.position == '1st'
+    assert [match.opponent for match in squad.history] == ['Chelsea', 'Liverpool', 'Fulham', 'Brentford']
+    assert [match.result for match in squad.history] == ['D', 'L', 'W', 'D']
+    assert squad.history[1].corners == 7
+    assert squad.history[1].shots == 17
+    assert squad.history[1].shots_on_target == 14
+    assert squad.history[2].match_summary[0].minute == '90+4'
+    # unplayed matches are skipped, squad page + one report per match
+    assert sum(fbref_adapter.calls.values()) == 5
+
+
+def test_squad_stats(fbref_session):
+    squad = arsenal(fbref_session)
+
+    assert squad.results() == {'W': 1, 'L': 1, 'D': 2, 'pts_pct': 42.0}
+    assert squad.corners() == {'total': 32, 'avg': 8.0}
+    assert squad.goals_for() == {'total': 5, 'avg': 1.25}
+    assert squad.clean_sheets() == 2
+    assert squad.shots_to_goal() == 7.8
+    assert squad.cards() == 0.75
+    assert squad.cards_half() == {'first': 0.5, 'second': 0.25}
+    assert squad.goals_half() == {'first': 0.5, 'second': 0.75}
+    assert squad.possible_striker() == ' Ars Player2 [2]'
+
+
+def test_squad_filters(fbref_session):
+    squad = Squad(name='Arsenal', competition='Premier League', venue='Home', session=fbref_session)
+    squad.match_summary(href=ARSENAL, previous_matches=10, competitions='same', venue='same')
+
+    assert [(match.competition, match.venue) for match in squad.history] == [
+        ('Premier League', 'Home'), ('Premier League', 'Home')
+    ]
+
+    with pytest.raises(ValueError):
+        squad.match_summary(href=ARSENAL, previous_matches=10, competitions='any', venue='all')
+
+
+def test_squad_export(fbref_session):
+    squad = arsenal(fbref_session)
+    history = squad.to_dict()
+
+    assert history[1]['match_summary'][0] == {'minute': '10', 'eventtype': 'Yellow', 'player': ' Ars Player2'}
+    assert squad.to_json().startswith('[{"time": "15:00", "competition": "Premier League"')
+
+
+def test_missing_match_report(fbref_session):
+    squad = Squad(name='Arsenal', competition='Premier League', venue='Home', session=fbref_session)
+
+    with pytest.raises(FetchError) as error:
+        squad._handle_match_report('/en/matches/00000000/Missing', 'Home')
+
+    assert error.value.status_code == 404
+
+
+def test_missing_squad_page(fbref_session):
+    squad = Squad(name='Missing', competition='Premier League', venue='Home', session=fbref_session)
+
+    with pytest.raises(FetchError) as error:
+        squad.match_summary(href='/en/squads/00000000/Missing-Stats', previous_matches=5, competitions='all', venue='all')
+
+    assert error.value.status_code == 404
+    assert squad.history == []
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    # answers the statuses queued on the server, then 200
+    def do_GET(self) -> None:
+        self.server.requests.append(time.monotonic())
+        status_code, headers = self.server.statuses.pop(0) if self.server.statuses else (200, {})
+        self.send_response(status_code)
+
+        for header, value in headers.items():
+            self.send_header(header, value)
+
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def flaky_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FlakyHandler)
+    server.statuses = []
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_session_retries(flaky_server):
+    url = f'http://127.0.0.1:{flaky_server.server_port}/'
+
+    # Retry-After is honoured before the retry
+    flaky_server.statuses = [(429, {'Retry-After': '1'})]
+    assert Session(retries=2, backoff_factor=0).get(url).status_code == 200
+    assert len(flaky_server.requests) == 2
+    assert flaky_server.requests[1]-flaky_server.requests[0] >= 0.9
+
+    # 5xx answers back off exponentially, the last answer is returned once retries are spent
+    flaky_server.requests.clear()
+    flaky_server.statuses = [(503, {})]*3
+    assert Session(retries=2, backoff_factor=0.2).get(url).status_code == 503
+    assert len(flaky_server.requests) == 3
+    assert flaky_server.requests[2]-flaky_server.requests[1] >= 0.35
+
+    flaky_server.statuses = [(503, {})]
+    squad = Squad(name='Arsenal', competition='Premier League', venue='Home', session=Session(retries=0))
+
+    with pytest.raises(FetchError) as error:
+        squad._handle_matchlog(url)
+
+    assert error.value.status_code == 503
+
+
+def test_request_error():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        url = f'http://127.0.0.1:{sock.getsockname()[1]}/'
+
+    squad = Squad(name='Arsenal', competition='Premier League', venue='Home', session=Session(retries=0))
+
+    with pytest.raises(FetchError) as error:
+        squad._handle_matchlog(url)
+
+    assert error.value.url == url
+    assert isinstance(error.value.__cause__, requests.RequestException)
+
+
+def test_day_batch_fetches_each_page_once(fbref_session, fbref_adapter):
+    matches = DayBatch(previous_matches=5, session=fbref_session).run(DATE)
+
+    assert max(fbref_adapter.calls.values()) == 1
+    expected = FbrefDayMatches(session=fbref_session).day_matches(DATE)
+
+    for match, reference in zip(matches[1:], expected[1:]):
+        assert match.describe(previous_matches=5) == reference.describe(previous_matches=5)
+        assert match.describe2(previous_matches=5) == reference.describe2(previous_matches=5)
+
+    fbref_adapter.calls.clear()
+    matches[1].describe(previous_matches=5)
+    assert sum(fbref_adapter.calls.values()) == 0
+
+
+def test_day_batch_failures(fbref_session, fbref_adapter, caplog):
+    class FailingAdapter(type(fbref_adapter)):
+        def send(self, request, **kwargs):
+            rsp = super().send(request, **kwargs)
+            if '/Real-Madrid-Stats' in request.url:
+                rsp.status_code, rsp.reason = 503, 'Service Unavailable'
+            return rsp
+
+    adapter = FailingAdapter()
+    fbref_session.mount('https://fbref.com/', adapter)
+    batch = DayBatch(previous_matches=5, session=fbref_session)
+
+    # the fixture of the failing squad page is left out, the others are collected
+    matches = batch.run(DATE)
+    assert sorted(match.home for match in matches) == ['Arsenal', 'Everton']
+    assert [(match.home, error.status_code) for match, error in batch.failures] == [('Barcelona', 503)]
+    assert adapter.calls['/en/squads/53a2f082/Real-Madrid-Stats'] == 1
+    assert "can't collect Barcelona X Real Madrid" in caplog.text
+
+
+def test_day_batch_with_store(fbref_session, fbref_adapter, tmp_path):
+    warehouse = Warehouse(str(tmp_path/'fbref.db'))
+    DayBatch(previous_matches=5, session=fbref_session, store=warehouse).run(DATE)
+
+    assert max(fbref_adapter.calls.values()) == 1
+
+    # a new batch reads the stored reports, only the schedule and squad pages are fetched again
+    fbref_adapter.calls.clear()
+    DayBatch(previous_matches=5, session=fbref_session, store=warehouse).run(DATE)
+
+    assert [path for path in fbref_adapter.calls if path.startswith('/en/matches/') and path!=f'/en/matches/{DATE}'] == []
+    assert max(fbref_adapter.calls.values()) == 1
+
+
+def test_page_cache(fbref_session, fbref_adapter, tmp_path):
+    cache = PageCache(directory=str(tmp_path))
+    first = arsenal(fbref_session, cache=cache).to_json()
+    fbref_adapter.calls.clear()
+
+    # a new cache on the same directory reads every page from disk
+    assert arsenal(fbref_session, cache=PageCache(directory=str(tmp_path))).to_json() == first
+    assert sum(fbref_adapter.calls.values()) == 0
+
+
+def test_page_cache_threads(tmp_path):
+    cache = PageCache(directory=str(tmp_path), max_disk_bytes=4096)
+    pages = [(f'https://fbref.com/en/matches/{index}', os.urandom(512)) for index in range(32)]
+
+    def store(page):
+        url, content = page
+        cache.set(url, content, 'report', {'etag': f'"{url}"'})
+        return cache.get(url, 'report')
+
+    # concurrent writers keep the disk size in line with the files left
+    assert fetch_all(store, pages*2, max_workers=8) == [content for _, content in pages*2]
+    assert cache._disk_bytes == sum(os.path.getsize(path) for path in cache._disk_files())
+    assert cache._disk_bytes<=4096
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+
+
+def test_history_store(fbref_session, fbref_adapter, tmp_path):
+    store = HistoryStore(directory=str(tmp_path))
+    first = arsenal(fbref_session, store=store)
+    fbref_adapter.calls.clear()
+
+    first.refresh(href=ARSENAL, previous_matches=10, competitions='all', venue='all')
+    assert list(fbref_adapter.calls) == [ARSENAL]
+    assert first.to_json() == arsenal(fbref_session).to_json()
+
+
+def test_async_describe(fbref_session):
+    async def describe():
+        async with AsyncScheduledMatches(session=fbref_session, client=ThreadClient(fbref_session)) as matches:
+            return [await match.describe(previous_matches=5) for match in (await matches.day_matches(DATE))[1:]]
+
+    expected = FbrefDayMatches(session=fbref_session).day_matches(DATE)[1:]
+
+    assert asyncio.run(describe()) == [match.describe(previous_matches=5) for match in expected]
+
+
+def test_async_registry(fbref_session, fbref_adapter):
+    expected = FbrefDayMatches(session=fbref_session).day_matches(DATE)[1]
+    expected = (expected.describe2(previous_matches=5), expected.describe(previous_matches=5))
+
+    async def describe(together):
+        async with AsyncScheduledMatches(session=fbref_session, client=ThreadClient(fbref_session)) as matches:
+            match = (await matches.day_matches(DATE))[1]
+
+            if together:
+                return tuple(await asyncio.gather(match.describe2(previous_matches=5), match.describe(previous_matches=5)))
+
+            return await match.describe2(previous_matches=5), await match.describe(previous_matches=5)
+
+    # views of a squad share its page and reports, sequential or concurrent
+    for together in (False, True):
+        fbref_adapter.calls.clear()
+        assert asyncio.run(describe(together)) == expected
+        assert max(fbref_adapter.calls.values()) == 1
+
+
+def test_async_sync_registry(fbref_session):
+    expected = FbrefDayMatches(session=fbref_session).matches_between('2022-09-24', '2022-09-25')
+
+    async def collect():
+        async with AsyncScheduledMatches(session=fbref_session, client=ThreadClient(fbref_session)) as matches:
+            between = await matches.matches_between('2022-09-24', '2022-09-25')
+            iterated = [match async for match in matches.iter_matches_between('2022-09-24', '2022-09-25')]
+            day = [match async for match in matches.iter_day_matches(DATE)]
+            return matches, between, iterated, day
+
+    matches, between, iterated, day = asyncio.run(collect())
+
+    assert [match._key for match in between] == [match._key for match in expected]
+    assert sorted(match._key for match in iterated) == sorted(match._key for match in expected)
+    assert [match._key for match in day] == [match._key for match in FbrefDayMatches(session=fbref_session).iter_day_matches(DATE)]
+
+    # the registry of async matches collects squads with blocking requests
+    assert matches.registry.matchlog(f'https://fbref.com{ARSENAL}')['position'] == '1st'
+    assert len(DayBatch(5, registry=matches.registry, session=fbref_session).run(DATE)) == 3
+
+
+def test_async_history_store(fbref_session, fbref_adapter, tmp_path):
+    store = HistoryStore(directory=str(tmp_path))
+
+    async def collect(ordered):
+        squad = AsyncSquad(name='Arsenal', competition='Premier League', venue='Home', session=fbref_session, client=ThreadClient(fbref_session), store=store)
+        matches = [match async for match in squad.iter_match_summary(href=ARSENAL, previous_matches=10, competitions='all', venue='all', ordered=ordered)]
+        return squad, matches
+
+    expected = arsenal(fbref_session).to_json()
+    first, _ = asyncio.run(collect(ordered=False))
+    assert first.to_json() == expected
+    fbref_adapter.calls.clear()
+
+    # stored reports are not fetched again
+    second, matches = asyncio.run(collect(ordered=True))
+    assert list(fbref_adapter.calls) == [ARSENAL]
+    assert second.to_json() == expected and matches == second.history
+
+
+def test_async_refresh(fbref_session, fbref_adapter, tmp_path):
+    async def refresh():
+        squad = AsyncSquad(name='Arsenal', competition='Premier League', venue='Home', session=fbref_session, client=ThreadClient(fbref_session), store=HistoryStore(directory=str(tmp_path)))
+        await squad.match_summary(href=ARSENAL, previous_matches=10, competitions='all', venue='all')
+        fbref_adapter.calls.clear()
+        await squad.refresh(href=ARSENAL, previous_matches=10, competitions='all', venue='all')
+        return squad
+
+    squad = asyncio.run(refresh())
+
+    assert list(fbref_adapter.calls) == [ARSENAL]
+    assert squad.to_json() == arsenal(fbref_session).to_json()
+
+
+def test_lxml_parser(fbref_session):
+    pytest.importorskip('lxml')
+
+    assert arsenal(fbref_session, parser='lxml').to_json() == arsenal(fbref_session, targeted=False).to_json()
+
+
+def test_columnar_stats(fbref_session):
+    pytest.importorskip('numpy')
+    squad = arsenal(fbref_session)
+
+    assert arsenal(fbref_session, columnar=True).stats() == squad.stats()
+
+
+def test_metrics(fbref_session, tmp_path):
+    events = []
+    metrics = Metrics(hooks=[lambda event, data: events.append(event)])
+    cache = PageCache(directory=str(tmp_path))
+    squad = arsenal(fbref_session, cache=cache, metrics=metrics)
+    squad.stats()
+
+    assert metrics.requests == {('squad', 200): 1, ('report', 200): 4}
+    assert metrics.cache_misses == {'squad': 1, 'report': 4}
+    assert {name for name, _ in metrics.stages} == {'fetch', 'parse', 'extract', 'aggregate'}
+    assert events.count('request') == 5
+
+    arsenal(fbref_session, cache=cache, metrics=metrics)
+    assert metrics.cache_hits == {'squad': 1, 'report': 4}
+    assert 'fbref_requests_total{kind="report",status="200"} 4' in metrics.to_prometheus()
+
+
+@pytest.mark.parametrize('targeted', [True, False])
+def test_extract_regression(targeted):
+    with open(os.path.join(FIXTURES, 'expected', 'extract.json')) as expected:
+        expected = json.load(expected)
+
+    for path, sides in expected['match_reports'].items():
+        for venue, report in sides.items():
+            extracted = extract_match_report(read_fixture(path), venue, targeted=targeted)
+            extracted['summary'] = [event.to_dict() for event in extracted['summary']]
+            assert extracted == report, path
+
+    for path, matchlog in expected['matchlogs'].items():
+        assert extract_matchlog(read_fixture(path), targeted=targeted) == matchlog, path
+
+
+def test_streaming(fbref_session):
+    matches = FbrefDayMatches(session=fbref_session)
+    streamed = list(matches.iter_day_matches(DATE))
+
+    assert sorted(streamed, key=lambda match: match.time)[0].home == matches.day_matches(DATE)[0].home
+    assert {match.home for match in streamed} == {'Barcelona', 'Arsenal', 'Everton'}
+
+    squad = Squad(name='Arsenal', competition='Premier League', venue='Home', session=fbref_session)
+    yielded = squad.iter_match_summary(href=ARSENAL, previous_matches=10, competitions='all', venue='all', ordered=True)
+
+    assert next(yielded).opponent == 'Chelsea'
+    assert squad.history == []
+    assert list(yielded)[-1].opponent == 'Brentford'
+    assert squad.to_json() == arsenal(fbref_session).to_json()
+
+
+def test_export(fbref_session, tmp_path):
+    squad = arsenal(fbref_session)
+    empty = Squad(name='Arsenal', competition='Premier League', venue='Home', session=fbref_session)
+    empty.to_csv(str(tmp_path/'empty.csv'))
+    squad.to_csv(str(tmp_path/'squad.csv'))
+
+    with open(tmp_path/'squad.csv') as csvfile:
+        rows = list(csv.DictReader(csvfile))
+
+    assert json.loads(rows[1]['match_summary'])[0] == {'minute': '10', 'eventtype': 'Yellow', 'player': ' Ars Player2'}
+
+    # appending a second time keeps a single header
+    for _ in range(2):
+        with CsvWriter(str(tmp_path/'matches.csv'), events_path=str(tmp_path/'events.csv')) as writer:
+            writer.write_all([squad, empty])
+
+    with open(tmp_path/'matches.csv') as csvfile:
+        assert len(list(csv.DictReader(csvfile))) == 8
+
+    with JsonlWriter(str(tmp_path/'matches.jsonl')) as writer:
+        writer.write(squad)
+
+    with open(tmp_path/'matches.jsonl') as jsonl:
+        assert [json.loads(line) for line in jsonl][1] == dict(squad='Arsenal', match=1, **squad.to_dict()[1])
+
+    # writers implement `write`, the base class is abstract
+    with pytest.raises(TypeError):
+        HistoryWriter(str(tmp_path/'matches.txt'))
+
+    pq = pytest.importorskip('pyarrow.parquet')
+
+    with ParquetWriter(str(tmp_path/'matches.parquet'), events_path=str(tmp_path/'events.parquet')) as writer:
+        writer.write_all([squad, empty])
+
+    matches = pq.read_table(str(tmp_path/'matches.parquet'))
+    events = pq.read_table(str(tmp_path/'events.parquet'))
+
+    assert matches.num_rows == 4
+    assert str(matches.schema.field('corners').type) == 'int64'
+    assert events.num_rows == sum(len(match.match_summary) for match in squad.history)
+
+
+def test_warehouse(fbref_session, fbref_adapter, tmp_path):
+    warehouse = Warehouse(str(tmp_path/'fbref.db'))
+    online = arsenal(fbref_session, store=warehouse)
+    fbref_adapter.calls.clear()
+
+    offline = Squad(name='Arsenal', competition='Premier League', venue='Home', session=fbref_session, store=warehouse)
+    offline.match_summary(href=ARSENAL, previous_matches=10, competitions='all', venue='all', offline=True)
+
+    # same matches as the squad page, most recent date first
+    rows = [row for row in extract_matchlog(read_fixture(ARSENAL))['rows'] if row['result']]
+    recent = sorted(range(len(rows)), key=lambda index: (rows[index]['date'], index), reverse=True)
+
+    assert sum(fbref_adapter.calls.values()) == 0
+    assert [match.opponent for match in offline.history] == [rows[index]['opponent'] for index in recent]
+    assert sorted(map(json.dumps, offline.to_dict())) == sorted(map(json.dumps, online.to_dict()))
+    assert offline.position == '1st'
+    assert offline.cards_half() == warehouse.cards_half(f'https://fbref.com{ARSENAL}', previous_matches=10)
+    assert offline.goals_half() == warehouse.goals_half(f'https://fbref.com{ARSENAL}', previous_matches=10)
+    assert warehouse.top_scorers(f'https://fbref.com{ARSENAL}', limit=1) == [(' Ars Player2', 2)]
+
+    same = Squad(name='Arsenal', competition='Premier League', venue='Home', session=fbref_session, store=warehouse)
+    same.match_summary(href=ARSENAL, previous_matches=1, competitions='same', venue='same', offline=True)
+    assert [match.opponent for match in same.history] == ['Fulham']
+
+
+def test_warehouse_season_change(tmp_path):
+    warehouse = Warehouse(str(tmp_path/'fbref.db'))
+    report = {'corners': 1, 'shots': 1, 'shots_on_target': 1, 'offsides': 1, 'fouls': 1, 'summary': []}
+
+    def row(date: str) -> dict:
+        return {'date': date, 'comp': 'Premier League', 'venue': 'Home', 'result': 'W', 'match_report': f'/en/matches/{date}'}
+
+    old_season = [row(f'2022-05-0{day}') for day in range(1, 6)]
+    warehouse.save('s', old_season, {match['match_report']: report for match in old_season})
+    # the new season page lists one match, at the top of the squad page
+    goal = {**report, 'summary': [Event('10’', EventType.GOAL, 'Player')]}
+    warehouse.save('s', [row('2022-08-06')], {'/en/matches/2022-08-06': goal})
+
+    assert [match['date'] for match, _ in warehouse.previous_matches('s', 3)] == ['2022-08-06', '2022-05-05', '2022-05-04']
+
+    # a match without its report stored is not counted in per game averages
+    warehouse.save('s', [row('2022-08-13'), row('2022-08-06')], {})
+    assert warehouse.goals_half('s', previous_matches=1) == {'first': 1.0, 'second': 0.0}
+
+
+def test_squad_registry(fbref_session, fbref_adapter):
+    matches = FbrefDayMatches(session=fbref_session).day_matches(DATE)
+    matches[1].describe2(previous_matches=5)
+    fetched = set(fbref_adapter.calls)
+    fbref_adapter.calls.clear()
+
+    # venue='same' is derived from the squad pages and reports already loaded
+    matches[1].describe(previous_matches=5)
+    assert set(fbref_adapter.calls).isdisjoint(fetched)
+    assert matches[1].home_stats(previous_matches=5, competitions='all', venue='all') is matches[1].home_stats(previous_matches=5, competitions='all', venue='all')
+
+    # Everton plays both fixtures of the day
+    fbref_adapter.calls.clear()
+    matches[2].home_stats(previous_matches=5, competitions='all', venue='all')
+    assert '/en/squads/d3fd31cc/Everton-Stats' not in fbref_adapter.calls
+
+
+def test_crawl_scheduler(fbref_session):
+    scheduler = CrawlScheduler(rpm=6000, burst=2, min_rpm=60, recovery=2)
+    squad = arsenal(fbref_session, scheduler=scheduler)
+
+    assert squad.position == '1st'
+
+    scheduler.feedback(429, retry_after=0.05)
+    assert scheduler.rate == 3000 and scheduler.throttled == 1
+    assert scheduler.acquire('report') >= 0.04
+
+    # pages waiting for a token are served by priority
+    order = []
+    scheduler = CrawlScheduler(rpm=600, burst=1)
+    scheduler.acquire('report')
+    threads = [threading.Thread(target=lambda kind=kind: scheduler.acquire(kind) and order.append(kind)) for kind in ('report', 'squad')]
+
+    for thread in threads:
+        thread.start()
+        time.sleep(0.01)
+
+    for thread in threads:
+        thread.join()
+
+    assert order == ['squad', 'report']
+
+
+def test_matches_between(fbref_session, fbref_adapter):
+    matches = FbrefDayMatches(session=fbref_session).matches_between('2022-09-24', '2022-09-25')
+
+    # Everton - Chelsea is listed on both days
+    assert [(match.date, match.home) for match in matches] == [
+        ('2022-09-24', 'Barcelona'), ('2022-09-24', 'Arsenal'), ('2022-09-24', 'Everton'),
+        ('2022-09-25', 'Inter'), ('2022-09-25', 'Fulham')
+    ]
+    assert fbref_adapter.calls['/en/matches/2022-09-25'] == 1
+
+    matches = FbrefDayMatches(session=fbref_session).matches_between('2022-09-24', '2022-09-25', competitions=['Serie A'])
+    assert [match.home for match in matches] == ['Inter']
+
+
+def test_competition_filter(fbref_session):
+    matches = FbrefDayMatches(session=fbref_session)
+
+    assert [match.home for match in matches.day_matches(DATE, competitions=['La Liga'])] == ['Barcelona']
+    assert [match.home for match in matches.day_matches(DATE, competitions=[9])] == ['Arsenal', 'Everton']
+
+    # fields are read from the schedule row on first access, the row is dropped once all of them are
+    match = next(matches.iter_day_matches(DATE, competitions='12'))
+    assert not hasattr(match, 'home_') and not hasattr(match, '__dict__')
+    assert (match.home, match.away, match.time) == ('Barcelona', 'Real Madrid', '00:00')
+    assert match._row is not None
+    assert match._materialize()._row is None and match.venue == match.venue_
+
+    # matches of a range hold no parse tree
+    assert all(match._row is None for match in matches.matches_between('2022-09-24', '2022-09-25'))
+
+
+def test_process_parsing(fbref_session):
+    squad = arsenal(fbref_session, processes=2)
+
+    assert squad.position == '1st'
+    assert squad.to_json() == arsenal(fbref_session).to_json()
+
+
+def test_league_index(fbref_session, fbref_adapter):
+    index = LeagueIndex(9, 'Premier League', session=fbref_session).build()
+    squad = Squad(name='Arsenal', competition='Premier League', venue='Home', session=fbref_session)
+    squad.index_summary(index, href=ARSENAL, previous_matches=5, competitions='same', venue='all')
+
+    # two competition pages, no squad page or match report
+    assert set(fbref_adapter.calls) == {'/en/comps/9/schedule/Premier-League-Scores-and-Fixtures', '/en/comps/9/Premier-League-Stats'}
+    assert squad.position == '1st'
+
+    expected = Squad(name='Arsenal', competition='Premier League', venue='Home', session=fbref_session)
+    expected.match_summary(href=ARSENAL, previous_matches=5, competitions='same', venue='all')
+    for stat in ('results', 'goals_for', 'goals_against', 'clean_sheets'):
+        assert getattr(squad, stat)() == getattr(expected, stat)()
+
+
+def test_conditional_requests(fbref_session, fbref_adapter):
+    metrics = Metrics()
+    cache = PageCache(ttl={'squad': 0})
+    first = arsenal(fbref_session, cache=cache, metrics=metrics)
+    parsed = metrics.stages[('parse', 'squad')]['calls']
+
+    # the expired squad page is revalidated, its matchlog is not parsed again
+    second = arsenal(fbref_session, cache=cache, metrics=metrics)
+
+    assert fbref_adapter.calls[ARSENAL] == 2
+    assert metrics.requests[('squad', 304)] == 1
+    assert metrics.saved['squad'] == len(read_fixture(ARSENAL))
+    assert metrics.stages[('parse', 'squad')]['calls'] == parsed
+    assert second.to_json() == first.to_json()
+
+
+def test_preview_service(fbref_session, fbref_adapter):
+    service = PreviewService(previous_matches=7, date=DATE, session=fbref_session)
+    service.start()
+    server = make_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}'
+
+    match = FbrefDayMatches(session=fbref_session).day_matches(DATE)[0]
+    expected = match.describe(previous_matches=7)
+    requests_made = sum(fbref_adapter.calls.values())
+
+    try:
+        fixtures = requests.get(f'{url}/fixtures').json()
+        fixture = next(fixture for fixture in fixtures if (fixture['home'], fixture['away']) == (match.home, match.away))
+
+        # lookups are answered from memory
+        assert requests.get(f'{url}/fixtures/{fixture["id"]}/describe').text == expected
+        assert requests.get(f'{url}/fixtures/{fixture["id"]}/json').json()['home']['name'] == match.home
+        assert requests.get(f'{url}/fixtures/unknown/describe').status_code == 404
+        assert sum(fbref_adapter.calls.values()) == requests_made
+
+        # the service cache lasts across refreshes, fresh pages are not requested again
+        assert service.refresh() and service.refreshes == 2
+        assert sum(fbref_adapter.calls.values()) == requests_made
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.stop()
+
+
+def test_preview_service_refresh(fbref_session, fbref_adapter):
+    service = PreviewService(previous_matches=7, date=DATE, session=fbref_session, cache=PageCache(ttl={'schedule': 0, 'squad': 0}))
+    schedule = f'/en/matches/{DATE}'
+
+    def report_calls():
+        return {path: calls for path, calls in fbref_adapter.calls.items() if path.startswith('/en/matches/') and path!=schedule}
+
+    service.load()
+    reports = report_calls()
+
+    # the expired schedule and squad pages are revalidated, match reports are kept by the cache
+    assert service.refresh()
+    assert report_calls() == reports
+    assert fbref_adapter.calls[schedule] == 2
+    assert all(calls == 2 for path, calls in fbref_adapter.calls.items() if path.startswith('/en/squads/'))
+
+
+def test_preview_service_expired_lookups(fbref_session, monkeypatch):
+    service = PreviewService(previous_matches=3, date=DATE, ttl=0, session=fbref_session)
+    service.load()
+    fixture = service.fixtures()[0]['id']
+    loading = threading.Event()
+    load = service.load
+
+    def slow_load():
+        loading.wait(5)
+        load()
+
+    threads = []
+
+    class Thread(threading.Thread):
+        def start(self):
+            threads.append(self)
+            super().start()
+
+    monkeypatch.setattr(service, 'load', slow_load)
+    monkeypatch.setattr('fbref.service.threading.Thread', Thread)
+
+    # lookups on expired previews are answered while a single refresh runs
+    assert all(service.get(fixture) for _ in range(50))
+    assert len(threads) == 1
+    loading.set()
+
+    for _ in range(50):
+        if service.refreshes == 2:
+            break
+        time.sleep(0.1)
+
+    assert service.refreshes == 2
+
+
+def test_suffixed_schedule_ids(fbref_session):
+    # tables may be split by round, e.g. 'all_sched_9_1', the id is still '9' and not '90'
+    content = read_fixture(f'/en/matches/{DATE}').replace(b'id="all_sched_12"', b'id="all_sched_90_1"').replace(b'id="all_sched_9"', b'id="all_sched_9_1"')
+    rsp = CachedResponse(f'https://fbref.com/en/matches/{DATE}', content)
+    expected = [(match.home, match.away) for match in FbrefDayMatches(session=fbref_session).day_matches(DATE, ['9'])]
+
+    for targeted in (True, False):
+        matches = FbrefDayMatches(session=fbref_session, targeted=targeted)._handle_day_matches(rsp, DATE, ['9'])
+        assert [(match.home, match.away) for match in matches] == expected
+
+
+def test_cli(fbref_session, tmp_path):
+    path = tmp_path/'matches.jsonl'
+    warehouse = tmp_path/'warehouse.db'
+
+    assert main(['batch', '--date', DATE, '-c', '9', '-n', '3', '-o', str(path), '--warehouse', str(warehouse)], session=fbref_session) == 0
+    rows = [json.loads(line) for line in path.read_text().splitlines()]
+    assert {row['squad'] for row in rows} == {'Arsenal', 'Everton', 'Chelsea'}
+
+    # export reads the warehouse filled by the batch, without any request
+    exported = tmp_path/'exported.jsonl'
+    assert main(['export', str(warehouse), '-n', '3', '-o', str(exported)]) == 0
+    assert len(exported.read_text().splitlines()) == len(rows)
+
+    # both commands name squads as the schedule does
+    assert {json.loads(line)['squad'] for line in exported.read_text().splitlines()} == {row['squad'] for row in rows}
+    stored = Warehouse(str(warehouse))
+    assert stored.name(f'https://fbref.com{ARSENAL}') == 'Arsenal'
+    stored.close()
+
+
+def test_cli_failures(fbref_session, fbref_adapter, tmp_path, capsys):
+    class FailingAdapter(type(fbref_adapter)):
+        def send(self, request, **kwargs):
+            rsp = super().send(request, **kwargs)
+            if '/Real-Madrid-Stats' in request.url:
+                rsp.status_code, rsp.reason = 503, 'Service Unavailable'
+            return rsp
+
+    fbref_session.mount('https://fbref.com/', FailingAdapter())
+    path = tmp_path/'matches.jsonl'
+
+    # the failed fixture is reported, the other squads are written
+    assert main(['batch', '--date', DATE, '-n', '3', '-o', str(path)], session=fbref_session) == 1
+    assert {json.loads(line)['squad'] for line in path.read_text().splitlines()} == {'Arsenal', 'Everton', 'Chelsea'}
+    assert '1 fixture(s) not collected' in capsys.readouterr().err
+
+
+def test_cli_arguments(fbref_session, tmp_path):
+    with pytest.raises(SystemExit):
+        main(['batch', '--date', DATE, '--start', DATE], session=fbref_session)
+
+    with pytest.raises(SystemExit):
+        main(['batch', '--end', DATE], session=fbref_session)
+
+    path = tmp_path/'previews.txt'
+    assert main(['batch', '--start', DATE, '-c', '9', '-n', '3', '-f', 'text', '-o', str(path)], session=fbref_session) == 0
+    assert 'Arsenal' in path.read_text()
+
+
+def test_lazy_import():
+    modules = subprocess.run(
+        [sys.executable, '-c', 'import sys, fbref, fbref.cli; print(" ".join(sys.modules))'],
+        capture_output=True, text=True, check=True
+    ).stdout.split()
+
+    assert 'bs4' not in modules and 'requests' not in modules
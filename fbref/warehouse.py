@@ -0,0 +1,242 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from .models import Event, EventType
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS squads (
+    url TEXT PRIMARY KEY,
+    name TEXT,
+    position TEXT,
+    updated_at REAL
+);
+CREATE TABLE IF NOT EXISTS matches (
+    squad TEXT NOT NULL,
+    url TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    date TEXT,
+    competition TEXT,
+    venue TEXT,
+    result TEXT,
+    opponent TEXT,
+    row TEXT NOT NULL,
+    reported INTEGER NOT NULL DEFAULT 0,
+    corners INTEGER,
+    shots INTEGER,
+    shots_on_target INTEGER,
+    offsides INTEGER,
+    fouls INTEGER,
+    PRIMARY KEY (squad, url)
+);
+CREATE TABLE IF NOT EXISTS events (
+    squad TEXT NOT NULL,
+    url TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    minute TEXT,
+    eventtype TEXT,
+    player TEXT,
+    PRIMARY KEY (squad, url, seq)
+);
+CREATE INDEX IF NOT EXISTS matches_squad ON matches (squad, seq);
+CREATE INDEX IF NOT EXISTS matches_competition ON matches (squad, competition, seq);
+CREATE INDEX IF NOT EXISTS matches_venue ON matches (squad, venue, seq);
+CREATE INDEX IF NOT EXISTS matches_date ON matches (date);
+CREATE INDEX IF NOT EXISTS matches_recent ON matches (squad, date, seq);
+CREATE INDEX IF NOT EXISTS events_eventtype ON events (eventtype, squad);
+'''
+
+# most recent first, `seq` (position in the last squad page) only breaks ties within a day
+RECENT = 'ORDER BY date DESC, seq DESC'
+# report fields kept as columns of `matches`
+REPORT_FIELDS = ('corners', 'shots', 'shots_on_target', 'offsides', 'fouls')
+
+
+class Warehouse(object):
+    r"""``Warehouse`` keeps squads, matches and events in a local SQLite database.
+
+        Matches are keyed by squad and match report url, with the matchlog row and
+        the stats of the squad side of the report; events have a table of their own.
+        It is a drop-in `store` (same `load`/`save` as `HistoryStore`), and
+        `Squad.match_summary(..., offline=True)` runs from it without any request,
+        filters being indexed queries.
+
+        See following example:
+
+            warehouse = Warehouse('~/.cache/fbref/warehouse.db')
+
+            squad = Squad(name, competition, venue, store=warehouse)
+
+            squad.match_summary(href, previous_matches=10, competitions='all', venue='all')
+
+            warehouse.top_scorers(squad_url, previous_matches=10)
+
+    """
+    def __init__(self, path: str) -> None:
+        self.path = os.path.expanduser(path)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+
+        # databases created before squad names were kept
+        if 'name' not in [column[1] for column in self._db.execute('PRAGMA table_info(squads)')]:
+            self._db.execute('ALTER TABLE squads ADD COLUMN name TEXT')
+
+    def close(self) -> None:
+        self._db.close()
+
+    def _query(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def _events(self, squad_url: str, match_urls: list) -> dict:
+        events = {match_url: [] for match_url in match_urls}
+        rows = self._query(
+            f'SELECT url, minute, eventtype, player FROM events WHERE squad=? AND url IN ({",".join("?"*len(match_urls))}) ORDER BY url, seq',
+            (squad_url, *match_urls)
+        )
+
+        for match_url, minute, eventtype, player in rows:
+            events[match_url].append(Event(minute, EventType.parse(eventtype), player))
+
+        return events
+
+    def _matches(self, squad_url: str, where: str = '', params: tuple = (), limit: int = -1) -> list:
+        rows = self._query(
+            f'SELECT url, row, reported, {", ".join(REPORT_FIELDS)} FROM matches WHERE squad=? {where} {RECENT} LIMIT ?',
+            (squad_url, *params, limit)
+        )
+        events = self._events(squad_url, [row[0] for row in rows if row[2]])
+        matches = []
+
+        for match_url, row, reported, *stats in rows:
+            report = None
+            if reported:
+                report = dict(zip(REPORT_FIELDS, stats), summary=events[match_url])
+
+            matches.append((match_url, json.loads(row), report))
+
+        return matches
+
+    def load(self, squad_url: str) -> dict:
+        """Return `{match_url: {'row': dict, 'report': dict or None}}` known for the squad."""
+        return {match_url: {'row': row, 'report': report} for match_url, row, report in self._matches(squad_url)}
+
+    def save(self, squad_url: str, rows: list, reports: dict, position: str = None, name: str = None) -> None:
+        """Store the matchlog rows of a squad with the reports collected so far.
+
+        :params rows: matchlog rows, played or not, in matchlog order.
+        :params reports: `{match_url: report}` of newly collected reports.
+        :params position: league position of the squad.
+        :params name: squad name as shown in the schedule, e.g. 'Manchester Utd', the stored one is kept when `None`.
+        """
+        with self._lock, self._db:
+            self._db.execute(
+                'INSERT INTO squads (url, name, position, updated_at) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (url) DO UPDATE SET name=COALESCE(excluded.name, name), position=excluded.position, updated_at=excluded.updated_at',
+                (squad_url, name, position, time.time())
+            )
+
+            for seq, row in enumerate(rows):
+                match_url = row.get('match_report')
+                if not match_url:
+                    continue
+
+                self._db.execute(
+                    'INSERT INTO matches (squad, url, seq, date, competition, venue, result, opponent, row) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) '
+                    'ON CONFLICT (squad, url) DO UPDATE SET seq=excluded.seq, date=excluded.date, competition=excluded.competition, '
+                    'venue=excluded.venue, result=excluded.result, opponent=excluded.opponent, row=excluded.row',
+                    (squad_url, match_url, seq, row.get('date'), row.get('comp'), row.get('venue'), row.get('result'), row.get('opponent'), json.dumps(row))
+                )
+
+            for match_url, report in reports.items():
+                self._db.execute(
+                    f'UPDATE matches SET reported=1, {", ".join(f"{field}=?" for field in REPORT_FIELDS)} WHERE squad=? AND url=?',
+                    (*[report[field] for field in REPORT_FIELDS], squad_url, match_url)
+                )
+                self._db.execute('DELETE FROM events WHERE squad=? AND url=?', (squad_url, match_url))
+                self._db.executemany(
+                    'INSERT INTO events (squad, url, seq, minute, eventtype, player) VALUES (?, ?, ?, ?, ?, ?)',
+                    [(squad_url, match_url, seq, event.minute, str(event.eventtype), event.player) for seq, event in enumerate(report['summary'])]
+                )
+
+    def squads(self) -> list:
+        """Return the url of every stored squad."""
+        return [url for url, in self._query('SELECT url FROM squads ORDER BY url')]
+
+    def name(self, squad_url: str) -> str:
+        """Return the squad name stored with the squad, `None` for squads saved without one."""
+        rows = self._query('SELECT name FROM squads WHERE url=?', (squad_url,))
+
+        return rows[0][0] if rows else None
+
+    def position(self, squad_url: str) -> str:
+        """Return the league position stored for the squad."""
+        rows = self._query('SELECT position FROM squads WHERE url=?', (squad_url,))
+
+        return rows[0][0] if rows else None
+
+    def _filters(self, competition: str = None, venue: str = None) -> tuple:
+        where = "AND result!=''"
+        params = ()
+
+        if competition is not None:
+            where += ' AND competition=?'
+            params += (competition,)
+
+        if venue is not None:
+            where += ' AND venue=?'
+            params += (venue,)
+
+        return where, params
+
+    def previous_matches(self, squad_url: str, previous_matches: int, competition: str = None, venue: str = None) -> list:
+        """Return the last N played matches of the squad with a stored report, most recent first, as `(row, report)`.
+
+        :params competition: keep only matches of this competition.
+        :params venue: keep only 'Home' or 'Away' matches.
+        """
+        where, params = self._filters(competition, venue)
+
+        return [(row, report) for _, row, report in self._matches(squad_url, f'{where} AND reported=1', params, previous_matches)]
+
+    def _last_matches(self, squad_url: str, previous_matches: int, competition: str, venue: str) -> tuple:
+        # only matches with stored events count, as in `previous_matches`
+        where, params = self._filters(competition, venue)
+        sql = f'SELECT url FROM matches WHERE squad=? {where} AND reported=1 {RECENT} LIMIT ?'
+
+        return sql, (squad_url, *params, previous_matches or -1)
+
+    def top_scorers(self, squad_url: str, previous_matches: int = None, competition: str = None, venue: str = None, limit: int = 5) -> list:
+        """Return `(player, goals)` of the best scorers over the last N played matches."""
+        last, params = self._last_matches(squad_url, previous_matches, competition, venue)
+
+        return self._query(
+            f'SELECT player, COUNT(*) AS goals FROM events WHERE squad=? AND eventtype=? AND url IN ({last}) '
+            'GROUP BY player ORDER BY goals DESC, player LIMIT ?',
+            (squad_url, str(EventType.GOAL), *params, limit)
+        )
+
+    def _per_half(self, squad_url: str, eventtypes: tuple, previous_matches: int, competition: str, venue: str) -> dict:
+        last, params = self._last_matches(squad_url, previous_matches, competition, venue)
+        matches, first, second = self._query(
+            f'SELECT (SELECT COUNT(*) FROM ({last})), '
+            'COALESCE(SUM(CAST(substr(minute, 1, 2) AS INTEGER)<46), 0), '
+            'COALESCE(SUM(CAST(substr(minute, 1, 2) AS INTEGER)>45), 0) '
+            f'FROM events WHERE squad=? AND eventtype IN ({",".join("?"*len(eventtypes))}) AND url IN ({last})',
+            (*params, squad_url, *[str(eventtype) for eventtype in eventtypes], *params)
+        )[0]
+
+        if matches==0:
+            return {'first': 0, 'second': 0}
+
+        return {'first': round(first/matches, 2), 'second': round(second/matches, 2)}
+
+    def cards_half(self, squad_url: str, previous_matches: int = None, competition: str = None, venue: str = None) -> dict:
+        """Return yellow and red cards per game in each half over the last N played matches."""
+        return self._per_half(squad_url, (EventType.YELLOW, EventType.RED), previous_matches, competition, venue)
+
+    def goals_half(self, squad_url: str, previous_matches: int = None, competition: str = None, venue: str = None) -> dict:
+        """Return goals per game in each half over the last N played matches."""
+        return self._per_half(squad_url, (EventType.GOAL,), previous_matches, competition, venue)
@@ -3,7 +3,7 @@ from setuptools import setup, find_packages
 NAME = "fbref"
 VERSION = "0.0.1"
 
-REQUIRES = ["beautifulsoup4==4.10.0"]
+REQUIRES = ["beautifulsoup4==4.10.0", "requests", "urllib3"]
 
 setup(
   name=NAME,
@@ -12,6 +12,9 @@ setup(
   author_email="abnerrios@yahoo.com",
   keywords=['Football', 'Bet', 'Data Analysis'],
   install_requires=REQUIRES,
+  extras_require={"lxml": ["lxml"], "async": ["aiohttp"], "numpy": ["numpy"], "parquet": ["pyarrow"], "brotli": ["brotli"]},
   packages=find_packages(),
+  entry_points={"console_scripts": ["fbref=fbref.cli:main"]},
+  python_requires=">=3.10",
   include_package_data=True
 )
\ No newline at end of file